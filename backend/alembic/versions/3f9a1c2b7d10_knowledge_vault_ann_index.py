@@ -0,0 +1,58 @@
+"""knowledge_vault ANN index on embedding
+
+Revision ID: 3f9a1c2b7d10
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c2b7d10'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _supports_hnsw(bind) -> bool:
+    # HNSW landed in pgvector 0.5.0; older installs only have IVFFlat
+    version = bind.execute(sa.text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+    if not version:
+        return True
+    major, minor = (int(p) for p in version.split(".")[:2])
+    return (major, minor) >= (0, 5)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    bind = op.get_bind()
+
+    # MiniLM embeddings are unit-normalized, so cosine distance is the matching metric
+    if _supports_hnsw(bind):
+        index_sql = (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_knowledge_vault_embedding_ann "
+            "ON knowledge_vault USING hnsw (embedding vector_cosine_ops) "
+            "WITH (m = 16, ef_construction = 64)"
+        )
+    else:
+        rows = bind.execute(sa.text("SELECT count(*) FROM knowledge_vault")).scalar() or 0
+        lists = max(10, rows // 1000)
+        index_sql = (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_knowledge_vault_embedding_ann "
+            f"ON knowledge_vault USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists})"
+        )
+
+    # CONCURRENTLY keeps the table writable while the index builds
+    with op.get_context().autocommit_block():
+        op.execute(index_sql)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_knowledge_vault_embedding_ann")
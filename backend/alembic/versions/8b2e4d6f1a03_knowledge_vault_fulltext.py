@@ -0,0 +1,39 @@
+"""knowledge_vault full-text search column
+
+Revision ID: 8b2e4d6f1a03
+Revises: 3f9a1c2b7d10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a03'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c2b7d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Stored generated column: Postgres keeps it in sync with content_chunk on every write
+    op.execute(
+        "ALTER TABLE knowledge_vault ADD COLUMN IF NOT EXISTS content_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', content_chunk)) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_knowledge_vault_content_tsv "
+            "ON knowledge_vault USING gin (content_tsv)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_knowledge_vault_content_tsv")
+    op.drop_column('knowledge_vault', 'content_tsv')
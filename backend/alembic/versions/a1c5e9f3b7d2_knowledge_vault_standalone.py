@@ -0,0 +1,34 @@
+"""knowledge_vault standalone flag: rows stored directly, not only through a document
+
+Revision ID: a1c5e9f3b7d2
+Revises: f6a2d8c4b0e7
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c5e9f3b7d2'
+down_revision: Union[str, Sequence[str], None] = 'f6a2d8c4b0e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant default: no table rewrite. Only rows first stored by a document are
+    # touched; a document row the user also stored directly was deduplicated away
+    # without a trace, so those stay owned by the document.
+    op.execute(
+        "ALTER TABLE knowledge_vault ADD COLUMN IF NOT EXISTS standalone BOOLEAN NOT NULL DEFAULT true"
+    )
+    op.execute("UPDATE knowledge_vault SET standalone = false WHERE source LIKE 'document:%'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE knowledge_vault DROP COLUMN IF EXISTS standalone")
@@ -0,0 +1,32 @@
+"""per-user vault generation counter for search result caching
+
+Revision ID: a4d1e8c3f5b7
+Revises: f2c9a7e4b813
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d1e8c3f5b7'
+down_revision: Union[str, Sequence[str], None] = 'f2c9a7e4b813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'vault_generations',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('generation', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('vault_generations')
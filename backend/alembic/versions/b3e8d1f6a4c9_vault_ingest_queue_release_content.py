@@ -0,0 +1,31 @@
+"""vault_ingest_queue: drop the content of finished items
+
+Revision ID: b3e8d1f6a4c9
+Revises: a1c5e9f3b7d2
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8d1f6a4c9'
+down_revision: Union[str, Sequence[str], None] = 'a1c5e9f3b7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Done items are already stored in knowledge_vault; the queue keeps only their status
+    op.alter_column('vault_ingest_queue', 'content', existing_type=sa.Text(), nullable=True)
+    op.execute("UPDATE vault_ingest_queue SET content = NULL WHERE status = 'done'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM vault_ingest_queue WHERE content IS NULL")
+    op.alter_column('vault_ingest_queue', 'content', existing_type=sa.Text(), nullable=False)
@@ -0,0 +1,34 @@
+"""knowledge_vault (user_id, id) index for keyset-paginated listing
+
+Revision ID: b9e3f1a7c2d6
+Revises: a4d1e8c3f5b7
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e3f1a7c2d6'
+down_revision: Union[str, Sequence[str], None] = 'a4d1e8c3f5b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Serves "WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?" without touching other users' rows
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_knowledge_vault_user_id_id "
+            "ON knowledge_vault (user_id, id)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_knowledge_vault_user_id_id")
@@ -0,0 +1,44 @@
+"""vault ingest queue
+
+Revision ID: c41d7e9a2b58
+Revises: 8b2e4d6f1a03
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e9a2b58'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d6f1a03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'vault_ingest_queue',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_vault_ingest_queue_id', 'vault_ingest_queue', ['id'])
+    op.create_index(
+        'ix_vault_ingest_queue_pending', 'vault_ingest_queue', ['id'],
+        postgresql_where=sa.text("status = 'pending'")
+    )
+    op.create_index('ix_vault_ingest_queue_user_status', 'vault_ingest_queue', ['user_id', 'status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('vault_ingest_queue')
@@ -0,0 +1,69 @@
+"""knowledge_vault category / source / created_at and per-category ANN indexes
+
+Revision ID: c7f2a9d4e1b0
+Revises: b9e3f1a7c2d6
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7f2a9d4e1b0'
+down_revision: Union[str, Sequence[str], None] = 'b9e3f1a7c2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mirrors app.models.vault_model.VAULT_CATEGORIES[1:] at the time of this revision
+INDEXED_CATEGORIES = ("brand_voice", "published_post", "growth_report", "research")
+
+
+def _supports_hnsw(bind) -> bool:
+    version = bind.execute(sa.text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+    if not version:
+        return True
+    major, minor = (int(p) for p in version.split(".")[:2])
+    return (major, minor) >= (0, 5)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant / now() defaults are stored in the catalog: no table rewrite.
+    # Existing rows become 'general' with created_at = migration time.
+    op.execute(
+        "ALTER TABLE knowledge_vault "
+        "ADD COLUMN IF NOT EXISTS category VARCHAR(32) NOT NULL DEFAULT 'general', "
+        "ADD COLUMN IF NOT EXISTS source VARCHAR(255), "
+        "ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()"
+    )
+    op.execute(
+        "ALTER TABLE vault_ingest_queue "
+        "ADD COLUMN IF NOT EXISTS category VARCHAR(32) NOT NULL DEFAULT 'general', "
+        "ADD COLUMN IF NOT EXISTS source VARCHAR(255)"
+    )
+
+    # Partial HNSW graphs per category; IVFFlat centroids trained on small slices are poor, so no fallback
+    if not _supports_hnsw(op.get_bind()):
+        return
+    with op.get_context().autocommit_block():
+        for category in INDEXED_CATEGORIES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_knowledge_vault_embedding_{category} "
+                f"ON knowledge_vault USING hnsw (embedding vector_cosine_ops) "
+                f"WITH (m = 16, ef_construction = 64) WHERE category = '{category}'"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for category in INDEXED_CATEGORIES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_knowledge_vault_embedding_{category}")
+    op.execute("ALTER TABLE vault_ingest_queue DROP COLUMN IF EXISTS source, DROP COLUMN IF EXISTS category")
+    op.execute(
+        "ALTER TABLE knowledge_vault DROP COLUMN IF EXISTS created_at, "
+        "DROP COLUMN IF EXISTS source, DROP COLUMN IF EXISTS category"
+    )
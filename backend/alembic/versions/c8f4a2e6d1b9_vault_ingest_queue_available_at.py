@@ -0,0 +1,32 @@
+"""vault_ingest_queue available_at: back off retried items
+
+Revision ID: c8f4a2e6d1b9
+Revises: b3e8d1f6a4c9
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f4a2e6d1b9'
+down_revision: Union[str, Sequence[str], None] = 'b3e8d1f6a4c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # now() is stable, so it is stored as a fast default: no table rewrite, and existing rows are claimable at once
+    op.add_column(
+        'vault_ingest_queue',
+        sa.Column('available_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now())
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('vault_ingest_queue', 'available_at')
@@ -0,0 +1,58 @@
+"""knowledge_vault content hash for duplicate suppression
+
+Revision ID: d5a8f3c6e214
+Revises: c41d7e9a2b58
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a8f3c6e214'
+down_revision: Union[str, Sequence[str], None] = 'c41d7e9a2b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# Must match app.services.rag_service.content_hash: whitespace-collapsed, lowercased, sha256 hex
+HASH_SQL = (
+    "encode(sha256(convert_to(lower(btrim(regexp_replace(content_chunk, '\\s+', ' ', 'g'))), 'UTF8')), 'hex')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('knowledge_vault', sa.Column('content_hash', sa.String(64), nullable=True))
+
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        # Backfill in id ranges so each transaction stays short
+        max_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM knowledge_vault")).scalar()
+        for start in range(0, max_id + 1, BATCH_SIZE):
+            bind.execute(sa.text(
+                f"UPDATE knowledge_vault SET content_hash = {HASH_SQL} "
+                "WHERE id >= :start AND id < :end AND content_hash IS NULL"
+            ), {"start": start, "end": start + BATCH_SIZE})
+
+        # Existing exact duplicates: keep the oldest row
+        bind.execute(sa.text(
+            "DELETE FROM knowledge_vault a USING knowledge_vault b "
+            "WHERE a.user_id = b.user_id AND a.content_hash = b.content_hash AND a.id > b.id"
+        ))
+
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_knowledge_vault_user_content_hash "
+            "ON knowledge_vault (user_id, content_hash)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ux_knowledge_vault_user_content_hash")
+    op.drop_column('knowledge_vault', 'content_hash')
@@ -0,0 +1,214 @@
+"""hash-partition knowledge_vault by user_id
+
+Revision ID: d8a4b6e2f9c1
+Revises: c7f2a9d4e1b0
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a4b6e2f9c1'
+down_revision: Union[str, Sequence[str], None] = 'c7f2a9d4e1b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+BATCH_SIZE = 5000
+
+COLUMNS = "id, user_id, content_chunk, embedding, embedding_model, content_hash, category, source, created_at"
+
+# Redundant once the primary key is (user_id, id)
+SKIPPED_INDEXES = ("knowledge_vault_pkey", "ix_knowledge_vault_user_id_id")
+
+COPY_BATCH_SQL = sa.text(f"""
+    WITH batch AS (
+        SELECT {COLUMNS} FROM knowledge_vault
+        WHERE id > :last_id
+        ORDER BY id
+        LIMIT :batch_size
+    ), copied AS (
+        INSERT INTO knowledge_vault_new ({COLUMNS})
+        SELECT {COLUMNS} FROM batch
+        ON CONFLICT DO NOTHING
+    )
+    SELECT max(id) FROM batch
+""")
+
+
+# Full reconciliation by id. The batched copy only moves forward by id, so it misses
+# rows whose transaction committed after a higher id was copied, and rows changed
+# (re-embedded, re-categorized) after they were copied.
+SYNC_SQL = (
+    sa.text(f"""
+        INSERT INTO knowledge_vault_new ({COLUMNS})
+        SELECT {", ".join("o." + c.strip() for c in COLUMNS.split(","))} FROM knowledge_vault o
+        WHERE NOT EXISTS (SELECT 1 FROM knowledge_vault_new n WHERE n.id = o.id)
+    """),
+    sa.text(f"""
+        UPDATE knowledge_vault_new n
+        SET ({COLUMNS}) = ({", ".join("o." + c.strip() for c in COLUMNS.split(","))})
+        FROM knowledge_vault o
+        WHERE n.id = o.id
+          AND ({", ".join("n." + c.strip() for c in COLUMNS.split(","))})
+              IS DISTINCT FROM ({", ".join("o." + c.strip() for c in COLUMNS.split(","))})
+    """),
+    sa.text(
+        "DELETE FROM knowledge_vault_new n "
+        "WHERE NOT EXISTS (SELECT 1 FROM knowledge_vault o WHERE o.id = n.id)"
+    ),
+)
+
+
+def _copy_batches(bind) -> None:
+    # Bulk copy. Resumable: picks up after the highest id already copied
+    last_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM knowledge_vault_new")).scalar()
+    while True:
+        batch_max = bind.execute(COPY_BATCH_SQL, {"last_id": last_id, "batch_size": BATCH_SIZE}).scalar()
+        if batch_max is None:
+            return
+        last_id = batch_max
+
+
+def _sync(bind) -> None:
+    for statement in SYNC_SQL:
+        bind.execute(statement)
+
+
+def _rename_index_tree(bind, old: str, new: str) -> None:
+    # Parent index plus one child per partition, named <new>_pNN
+    children = bind.execute(sa.text(
+        "SELECT c.relname AS child, t.relname AS partition FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_index x ON x.indexrelid = c.oid "
+        "JOIN pg_class t ON t.oid = x.indrelid "
+        "WHERE i.inhparent = to_regclass(:name)"
+    ), {"name": old}).all()
+    for child, partition in children:
+        suffix = partition.replace("knowledge_vault_", "", 1)
+        bind.execute(sa.text(f"ALTER INDEX {child} RENAME TO {new}_{suffix}"))
+    bind.execute(sa.text(f"ALTER INDEX {old} RENAME TO {new}"))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    dimension = bind.execute(sa.text(
+        "SELECT atttypmod FROM pg_attribute "
+        "WHERE attrelid = 'knowledge_vault'::regclass AND attname = 'embedding' AND NOT attisdropped"
+    )).scalar()
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('knowledge_vault', 'id')")).scalar()
+    index_defs = bind.execute(sa.text(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = 'knowledge_vault'"
+    )).all()
+
+    # 1. The partitioned table; ids keep coming from the existing sequence
+    op.execute(f"""
+        CREATE TABLE IF NOT EXISTS knowledge_vault_new (
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'::regclass),
+            user_id INTEGER NOT NULL,
+            content_chunk VARCHAR NOT NULL,
+            embedding vector({int(dimension)}) NOT NULL,
+            embedding_model VARCHAR(128),
+            content_hash VARCHAR(64),
+            category VARCHAR(32) NOT NULL DEFAULT 'general',
+            source VARCHAR(255),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content_chunk)) STORED,
+            CONSTRAINT knowledge_vault_new_pkey PRIMARY KEY (user_id, id),
+            CONSTRAINT knowledge_vault_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)
+        ) PARTITION BY HASH (user_id)
+    """)
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS knowledge_vault_p{remainder:02d} PARTITION OF knowledge_vault_new "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+
+    with op.get_context().autocommit_block():
+        # 2. Copy in batches, each its own transaction; the live table stays writable
+        _copy_batches(bind)
+
+        # 3. Same indexes as the live table (ANN, per-category, quantized, GIN, unique hash).
+        # The new table takes no traffic yet, so plain builds (faster than per-partition CONCURRENTLY) are fine.
+        for name, definition in index_defs:
+            if name in SKIPPED_INDEXES:
+                continue
+            definition = definition.replace(f"INDEX {name} ON ", f"INDEX IF NOT EXISTS {name}_new ON ", 1)
+            definition = definition.replace(" ON public.knowledge_vault ", " ON knowledge_vault_new ", 1)
+            definition = definition.replace(" ON knowledge_vault ", " ON knowledge_vault_new ", 1)
+            bind.execute(sa.text(definition))
+
+        # Everything written during the copy and the index builds, while writers still run,
+        # so the pass under the lock below has little left to move
+        _copy_batches(bind)
+        _sync(bind)
+
+    # 4. Final diff and swap. The lock blocks writers for the diff (a full join on id of both
+    # tables, readers still served); DROP TABLE then takes ACCESS EXCLUSIVE, blocking readers
+    # too until this transaction commits.
+    op.execute("LOCK TABLE knowledge_vault IN SHARE ROW EXCLUSIVE MODE")
+    _sync(bind)
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute("DROP TABLE knowledge_vault")
+    op.execute("ALTER TABLE knowledge_vault_new RENAME TO knowledge_vault")
+    op.execute("ALTER TABLE knowledge_vault RENAME CONSTRAINT knowledge_vault_new_pkey TO knowledge_vault_pkey")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY knowledge_vault.id")
+    for name, _ in index_defs:
+        if name not in SKIPPED_INDEXES:
+            _rename_index_tree(bind, f"{name}_new", name)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    dimension = bind.execute(sa.text(
+        "SELECT atttypmod FROM pg_attribute "
+        "WHERE attrelid = 'knowledge_vault'::regclass AND attname = 'embedding' AND NOT attisdropped"
+    )).scalar()
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('knowledge_vault', 'id')")).scalar()
+    index_defs = bind.execute(sa.text(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = 'knowledge_vault'"
+    )).all()
+
+    op.execute(f"""
+        CREATE TABLE knowledge_vault_new (
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'::regclass),
+            user_id INTEGER NOT NULL,
+            content_chunk VARCHAR NOT NULL,
+            embedding vector({int(dimension)}) NOT NULL,
+            embedding_model VARCHAR(128),
+            content_hash VARCHAR(64),
+            category VARCHAR(32) NOT NULL DEFAULT 'general',
+            source VARCHAR(255),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content_chunk)) STORED,
+            CONSTRAINT knowledge_vault_new_pkey PRIMARY KEY (id),
+            CONSTRAINT knowledge_vault_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    op.execute(f"INSERT INTO knowledge_vault_new ({COLUMNS}) SELECT {COLUMNS} FROM knowledge_vault")
+    for name, definition in index_defs:
+        if name == "knowledge_vault_pkey":
+            continue
+        definition = definition.replace(f"INDEX {name} ON ONLY ", f"INDEX {name}_new ON ", 1)
+        definition = definition.replace(" ON public.knowledge_vault ", " ON knowledge_vault_new ", 1)
+        definition = definition.replace(" ON knowledge_vault ", " ON knowledge_vault_new ", 1)
+        op.execute(definition)
+    op.execute("CREATE INDEX ix_knowledge_vault_user_id_id_new ON knowledge_vault_new (user_id, id)")
+
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute("DROP TABLE knowledge_vault")
+    op.execute("ALTER TABLE knowledge_vault_new RENAME TO knowledge_vault")
+    op.execute("ALTER TABLE knowledge_vault RENAME CONSTRAINT knowledge_vault_new_pkey TO knowledge_vault_pkey")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY knowledge_vault.id")
+    for name, _ in index_defs:
+        if name != "knowledge_vault_pkey":
+            op.execute(f"ALTER INDEX {name}_new RENAME TO {name}")
+    op.execute("ALTER INDEX ix_knowledge_vault_user_id_id_new RENAME TO ix_knowledge_vault_user_id_id")
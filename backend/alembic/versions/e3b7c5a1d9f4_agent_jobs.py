@@ -0,0 +1,49 @@
+"""agent job queue
+
+Revision ID: e3b7c5a1d9f4
+Revises: d8a4b6e2f9c1
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7c5a1d9f4'
+down_revision: Union[str, Sequence[str], None] = 'd8a4b6e2f9c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'agent_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('thread_id', sa.String(36), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('kind', sa.String(16), nullable=False, server_default='run'),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(16), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_agent_jobs_id', 'agent_jobs', ['id'])
+    op.create_index('ix_agent_jobs_thread_id', 'agent_jobs', ['thread_id'])
+    op.create_index(
+        'ix_agent_jobs_queued', 'agent_jobs', ['id'],
+        postgresql_where=sa.text("status = 'queued'")
+    )
+    op.create_index('ix_agent_jobs_user_status', 'agent_jobs', ['user_id', 'status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('agent_jobs')
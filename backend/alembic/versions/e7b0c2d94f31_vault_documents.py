@@ -0,0 +1,53 @@
+"""vault documents and document chunk links
+
+Revision ID: e7b0c2d94f31
+Revises: d5a8f3c6e214
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b0c2d94f31'
+down_revision: Union[str, Sequence[str], None] = 'd5a8f3c6e214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'vault_documents',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('content_hash', sa.String(64), nullable=False),
+        sa.Column('chunk_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint('user_id', 'name', name='uq_vault_documents_user_name'),
+    )
+    op.create_index('ix_vault_documents_id', 'vault_documents', ['id'])
+
+    op.create_table(
+        'vault_document_chunks',
+        sa.Column(
+            'document_id', sa.Integer(),
+            sa.ForeignKey('vault_documents.id', ondelete='CASCADE'), primary_key=True
+        ),
+        sa.Column('position', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('chunk_hash', sa.String(64), nullable=False),
+    )
+    op.create_index('ix_vault_document_chunks_user_hash', 'vault_document_chunks', ['user_id', 'chunk_hash'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('vault_document_chunks')
+    op.drop_table('vault_documents')
@@ -0,0 +1,49 @@
+"""knowledge_vault embedding model column and re-embed job checkpoints
+
+Revision ID: f2c9a7e4b813
+Revises: e7b0c2d94f31
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c9a7e4b813'
+down_revision: Union[str, Sequence[str], None] = 'e7b0c2d94f31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant default is stored in the catalog, so existing rows are not rewritten
+    op.execute(
+        "ALTER TABLE knowledge_vault ADD COLUMN IF NOT EXISTS embedding_model VARCHAR(128) "
+        "DEFAULT 'all-MiniLM-L6-v2'"
+    )
+    op.execute("ALTER TABLE knowledge_vault ALTER COLUMN embedding_model DROP DEFAULT")
+
+    op.create_table(
+        'vault_reembed_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('target_model', sa.String(128), nullable=False),
+        sa.Column('dimension', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='running'),
+        sa.Column('last_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rows_done', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cutover_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_vault_reembed_jobs_id', 'vault_reembed_jobs', ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('vault_reembed_jobs')
+    op.execute("ALTER TABLE knowledge_vault DROP COLUMN IF EXISTS embedding_model")
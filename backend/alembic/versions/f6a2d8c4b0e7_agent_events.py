@@ -0,0 +1,40 @@
+"""agent workflow event log for streaming
+
+Revision ID: f6a2d8c4b0e7
+Revises: e3b7c5a1d9f4
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a2d8c4b0e7'
+down_revision: Union[str, Sequence[str], None] = 'e3b7c5a1d9f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'agent_events',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('thread_id', sa.String(36), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('kind', sa.String(16), nullable=False),
+        sa.Column('node', sa.String(32), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint('thread_id', 'seq', name='ux_agent_events_thread_seq'),
+    )
+    op.create_index('ix_agent_events_created_at', 'agent_events', ['created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('agent_events')
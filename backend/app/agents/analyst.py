@@ -1,24 +1,13 @@
 from app.agents.state import AgentState
 from app.agents.tools import recommend_schedule
 from langchain_core.messages import HumanMessage
-from langchain.agents import create_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
-from app.config.settings import settings
-import os
+from app.core.factory import MultiModelFactory
 import json
 
 # Define Tools
 tools = [recommend_schedule]
 
-def get_model(provider: str):
-    # Analyst needs logic, Gemini Flash is good.
-    return ChatGoogleGenerativeAI(
-        model="gemini-3.0-flash",
-        temperature=0.2,
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
-
-def analyst_node(state: AgentState):
+async def analyst_node(state: AgentState):
     """
     The Analyst Agent determines the optimal posting schedule and predicts reach.
     Now powered by an Agent Brain using 'recommend_schedule' tool.
@@ -28,9 +17,8 @@ def analyst_node(state: AgentState):
     trend_data = state.get("trend_data", "")
     follower_count = state.get("follower_count", 50000) # Default/Mock
     
-    # Initialize Logic
-    llm = get_model("gemini")
-    agent = create_agent(llm, tools=tools)
+    # Analyst needs logic, Gemini Flash is good.
+    agent = MultiModelFactory.get_agent("analyst", "gemini", 0.2, tools)
     
     prompt = f"""
     You are the Senior Data Analyst.
@@ -50,7 +38,7 @@ def analyst_node(state: AgentState):
     """
     
     try:
-        response = agent.invoke({"messages": [HumanMessage(content=prompt)]})
+        response = await agent.ainvoke({"messages": [HumanMessage(content=prompt)]})
         
         # Parse output
         output_text = ""
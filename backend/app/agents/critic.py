@@ -1,47 +1,22 @@
 from app.agents.state import AgentState
 from app.agents.tools import predict_virality_score
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain.agents import create_agent
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
-from app.config.settings import settings
-import os
+from app.core.factory import MultiModelFactory
 import re
 
 # Define tools
 tools = [predict_virality_score]
 
-def get_model(provider: str):
-    if provider.lower() == "gemini":
-        return ChatGoogleGenerativeAI(
-            model="gemini-3.0-flash",
-            temperature=0.1,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
-    else:
-        # Default to Groq
-        if not settings.GROQ_API_KEY:
-             return ChatGroq(temperature=0, model_name="llama3-70b-8192", api_key="missing_key")
-             
-        return ChatGroq(
-            temperature=0, 
-            model_name="llama3-70b-8192",
-            api_key=settings.GROQ_API_KEY
-        )
-
-def critic_node(state: AgentState):
+async def critic_node(state: AgentState):
     """
     The Viral Critic evaluates the draft using the ML model.
-    Uses 'create_agent' and supports multiple model providers.
+    Supports multiple model providers; the agent is shared across revision loops.
     """
     draft = state.get("draft", "")
     provider = state.get("model_provider", "groq")
     
-    # Initialize Model
-    model = get_model(provider)
-    
-    # Create Agent (User's requested syntax)
-    agent = create_agent(model, tools=tools)
+    temperature = 0.1 if provider.lower() == "gemini" else 0
+    agent = MultiModelFactory.get_agent("critic", provider, temperature, tools)
     
     # Execute
     prompt_text = f"""
@@ -53,7 +28,7 @@ def critic_node(state: AgentState):
     
     try:
         # Try invoking directly (LangGraph style)
-        response = agent.invoke({"messages": [HumanMessage(content=prompt_text)]})
+        response = await agent.ainvoke({"messages": [HumanMessage(content=prompt_text)]})
         
         # Handle Output Parsing based on return type
         output = ""
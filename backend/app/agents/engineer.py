@@ -1,34 +1,12 @@
 from app.agents.state import AgentState
 from app.agents.tools import generate_growth_chart, monitor_social_media, store_in_vault
 from langchain_core.messages import HumanMessage
-from langchain.agents import create_agent
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
-from app.config.settings import settings
-import os
+from app.core.factory import MultiModelFactory
 
 # Define tools
 tools = [generate_growth_chart, monitor_social_media]
 
-def get_model(provider: str):
-    if provider.lower() == "gemini":
-        return ChatGoogleGenerativeAI(
-            model="gemini-3.0-flash",
-            temperature=0.1,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
-    else:
-        # Default to Groq
-        if not settings.GROQ_API_KEY:
-             return ChatGroq(temperature=0, model_name="llama3-70b-8192", api_key="missing_key")
-
-        return ChatGroq(
-            temperature=0, 
-            model_name="llama3-70b-8192",
-            api_key=settings.GROQ_API_KEY
-        )
-
-def engineer_node(state: AgentState):
+async def engineer_node(state: AgentState):
     """
     The Engineer Agent (Redefined): Social Media Monitor & Strategist.
     It monitors handles, provides growth charts, and suggests improvements.
@@ -36,11 +14,8 @@ def engineer_node(state: AgentState):
     user_id = state.get("user_id", 1)
     provider = state.get("model_provider", "groq")
     
-    # Initialize Model
-    model = get_model(provider)
-    
-    # Create Agent
-    agent = create_agent(model, tools=tools)
+    temperature = 0.1 if provider.lower() == "gemini" else 0
+    agent = MultiModelFactory.get_agent("engineer", provider, temperature, tools)
     
     # Logic: The engineer runs to check on the user's status and provide a report.
     # It doesn't necessarily depend on a single draft, but on the user's overall state.
@@ -60,7 +35,7 @@ def engineer_node(state: AgentState):
     """
 
     try:
-        response = agent.invoke({"messages": [HumanMessage(content=prompt)]})
+        response = await agent.ainvoke({"messages": [HumanMessage(content=prompt)]})
         
         # Handle Output Parsing
         if isinstance(response, dict) and "messages" in response:
@@ -71,9 +46,11 @@ def engineer_node(state: AgentState):
              engineer_report = str(response)
         
         # Store Report for RAG
-        store_in_vault.invoke({
+        await store_in_vault.ainvoke({
             "content": f"ENGINEER REPORT:\n{engineer_report}",
-            "user_id": user_id
+            "user_id": user_id,
+            "category": "growth_report",
+            "source": "agent:engineer"
         })
         
     except Exception as e:
@@ -90,10 +90,15 @@ workflow.add_conditional_edges(
 workflow.add_edge("engineer", END)
 workflow.add_edge("guru", END)
 
-from langgraph.checkpoint.memory import MemorySaver
+from app.services.checkpoint_service import CheckpointService
 
-# ... (Previous code)
+_compiled = None
 
-# Compile with Checkpointer for persistence (required for HITL)
-memory = MemorySaver()
-app = workflow.compile(checkpointer=memory)
+async def get_agent_app():
+    """
+    The compiled workflow, with the durable checkpointer (required for HITL).
+    """
+    global _compiled
+    if _compiled is None:
+        _compiled = workflow.compile(checkpointer=await CheckpointService().open())
+    return _compiled
@@ -1,23 +1,13 @@
 from app.agents.state import AgentState
 from app.agents.tools import search_vault, monitor_social_media, generate_growth_chart, repurpose_content
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.agents import create_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_google_genai import ChatGoogleGenerativeAI
-from app.config.settings import settings
-import os
+from app.core.factory import MultiModelFactory
 
 # Define Guru Tools
 tools = [search_vault, monitor_social_media, generate_growth_chart, repurpose_content]
 
-def get_model(provider: str):
-    return ChatGoogleGenerativeAI(
-        model="gemini-3.0-flash",
-        temperature=0.3,
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
-
-def guru_node(state: AgentState):
+async def guru_node(state: AgentState):
     """
     The Guru Agent: Interactive RAG Chatbot & Strategist.
     Acts as a Senior Brand Consultant.
@@ -26,10 +16,7 @@ def guru_node(state: AgentState):
     chat_history = state.get("chat_history", [])
     user_input = state.get("input", "")
     
-    llm = get_model("gemini")
-    
-    # Create Agent
-    agent = create_agent(llm, tools=tools)
+    agent = MultiModelFactory.get_agent("guru", "gemini", 0.3, tools)
     
     prompt_text = f"""
     You are the Guru, a Senior Social Media Strategy Consultant for User {user_id}.
@@ -51,7 +38,7 @@ def guru_node(state: AgentState):
         messages = list(chat_history)
         messages.append(HumanMessage(content=prompt_text))
         
-        response = agent.invoke({"messages": messages})
+        response = await agent.ainvoke({"messages": messages})
         
         # Parse Output
         full_response = ""
@@ -1,38 +1,12 @@
 from app.agents.state import AgentState
 from app.agents.tools import search_web, search_vault
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain.agents import create_agent
-from langchain_groq import ChatGroq
-from langchain_google_genai import ChatGoogleGenerativeAI
-from app.config.settings import settings
-import os
+from app.core.factory import MultiModelFactory
 
 # Define tools for the agent
 tools = [search_web, search_vault]
 
-def get_model(provider: str):
-    if provider.lower() == "gemini":
-        return ChatGoogleGenerativeAI(
-            model="gemini-3.0-flash",
-            temperature=0.7,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
-    else:
-        # Default to Groq
-        if not settings.GROQ_API_KEY:
-            # Prevent crash, allow agent to fail gracefully later or now
-            # We can't return None easily if expected to be a ChatModel.
-            # But we can let it fail at runtime or return a dummy that errors when invoked.
-            # For now, pass a dummy key so it instantiates, but errors on call.
-            return ChatGroq(temperature=0.7, model_name="llama3-70b-8192", api_key="missing_key")
-            
-        return ChatGroq(
-            temperature=0.7, 
-            model_name="llama3-70b-8192",
-            api_key=settings.GROQ_API_KEY
-        )
-
-def scout_node(state: AgentState):
+async def scout_node(state: AgentState):
     """
     The Trend Scout looks for trending topics based on the input AND brand voice.
     Refactored to use 'create_react_agent' and supports multiple model providers.
@@ -41,18 +15,15 @@ def scout_node(state: AgentState):
     topic = state.get("input", "latest tech trends")
     provider = state.get("model_provider", "groq")
     
-    # Initialize Model
-    model = get_model(provider)
-    
-    # Create Agent (User's syntax)
-    agent = create_agent(model, tools=tools)
+    # Cached per (role, provider, temperature); reused across runs
+    agent = MultiModelFactory.get_agent("scout", provider, 0.7, tools)
     
     prompt = f"""
     You are a Strategic Trend Scout.
     
     Your goal is to find trending topics that align with the user's Brand Voice.
     
-    Step 1: Use `search_vault` to find "Brand Voice" or "Brand Guidelines" for user_id {user_id}.
+    Step 1: Use `search_vault` with category 'brand_voice' to find "Brand Voice" or "Brand Guidelines" for user_id {user_id}.
     Step 2: Use `search_web` to find latest trends related to '{topic}'.
     Step 3: Filter and analyze the trends to find those that best fit the Brand Voice.
     
@@ -61,7 +32,7 @@ def scout_node(state: AgentState):
     
     try:
         # Invoke Agent
-        response = agent.invoke({"messages": [HumanMessage(content=prompt)]})
+        response = await agent.ainvoke({"messages": [HumanMessage(content=prompt)]})
         
         # Handle Output Parsing
         output = ""
@@ -1,17 +1,9 @@
 from app.agents.state import AgentState
 from langchain_core.messages import HumanMessage
-from langchain_groq import ChatGroq
+from app.core.factory import MultiModelFactory
+from app.config.settings import settings
 
-try:
-    from app.config.settings import settings
-    if settings.GROQ_API_KEY:
-        llm = ChatGroq(temperature=0.7, model_name="llama3-70b-8192", api_key=settings.GROQ_API_KEY)
-    else:
-        llm = None
-except Exception:
-    llm = None
-
-def scripter_node(state: AgentState):
+async def scripter_node(state: AgentState):
     """
     The Content Scripter generates a post draft based on the trend data.
     """
@@ -42,9 +34,10 @@ def scripter_node(state: AgentState):
         Keep it engaging, concise, and use hashtags.
         """
     
-    if not llm:
+    if not settings.GROQ_API_KEY:
         return {"draft": "Error: Groq API Key not configured.", "revision_count": revision_count}
     
-    response = llm.invoke([HumanMessage(content=prompt)])
+    llm = MultiModelFactory.get_chat_model("groq", 0.7)
+    response = await llm.ainvoke([HumanMessage(content=prompt)])
     
     return {"draft": response.content, "revision_count": revision_count + 1}
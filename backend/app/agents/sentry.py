@@ -4,36 +4,24 @@ from app.config.database import SessionLocal
 from app.models.content_draft import ContentDraft, ContentPlatform
 from app.models.project_model import Project
 from langchain_core.messages import HumanMessage
-from langchain.agents import create_agent
 # from langchain.agents.format_scratchpad import format_to_openai_functions
 # from langchain.agents.output_parsers import OpenAIFunctionsAgentOutputParser
 # from langchain.tools.render import format_tool_to_openai_function
 # from langchain_community.tools.convert_to_openai import format_tool_to_openai_function
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_google_genai import ChatGoogleGenerativeAI
-from app.config.settings import settings
-import os
+from app.core.factory import MultiModelFactory
 
-# Helper to get model
-def get_model(provider: str):
-    return ChatGoogleGenerativeAI(
-        model="gemini-3.0-flash",
-        temperature=0.1,
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
+# Define Tools
+tools = [post_to_platform, store_in_vault, save_draft_to_db]
 
-def sentry_node(state: AgentState):
+async def sentry_node(state: AgentState):
     """
     Sentry Agent: The Gatekeeper (Now with a Brain).
     Responsible for final approval, safety checks, and database management.
     """
-    llm = get_model(state.get("model_provider", "gemini"))
-    
-    # Define Tools
-    tools = [post_to_platform, store_in_vault, save_draft_to_db]
-    # Create Agent
+    # Always Gemini, whatever the run's provider
     # Note: We trust the prompts to guide the agent to call tools.
-    agent = create_agent(llm, tools=tools)
+    agent = MultiModelFactory.get_agent("sentry", "gemini", 0.1, tools)
 
     # Prompt
     prompt_text = f"""
@@ -55,7 +43,7 @@ def sentry_node(state: AgentState):
     """
     
     try:
-        response = agent.invoke({"messages": [HumanMessage(content=prompt_text)]})
+        response = await agent.ainvoke({"messages": [HumanMessage(content=prompt_text)]})
         
         # Parse output
         status = "pending"
@@ -1,39 +1,43 @@
 from datetime import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
+import asyncio
 import uuid
-import os
 
 from langchain_core.tools import tool
 from typing import List, Dict, Any, Optional
-from tavily import TavilyClient
-from sqlmodel import Session, create_engine
+from tavily import AsyncTavilyClient
+from sqlalchemy import select
 from app.config.settings import settings
 from app.services.scraper import ScraperService
-from app.services.rag_service import RagService
+from app.services.rag_service import RagService, SEARCH_MODES
+from app.models.vault_model import VAULT_CATEGORIES
 from app.services.ml_service import MLService
+from app.services.heatmap_service import HeatmapService
+from app.services.social_data_service import SocialDataService
+from app.services.chart_service import ChartService
+from app.services.vault_ingest_worker import aenqueue_content
 from app.models.content_draft import ContentDraft, ContentPlatform
 from app.models.project_model import Project
-from app.config.database import SessionLocal
+from app.config.database import AsyncSessionLocal, SessionLocal
 from app.models.social_account import SocialAccount
 
 # Initialize Clients
+# Tools are async so agent runs never block the event loop: I/O is awaited, while
+# sync DB work (RagService), model inference and pandas run in worker threads.
 try:
-    tavily_client = TavilyClient(api_key=settings.TAVILY_API_KEY)
+    tavily_client = AsyncTavilyClient(api_key=settings.TAVILY_API_KEY)
 except Exception:
     tavily_client = None
 scraper_service = ScraperService()
 rag_service = RagService()
 ml_service = MLService()
-
-# Create Engine
-DATABASE_URL = settings.DATABASE_URL
-engine = create_engine(DATABASE_URL)
+heatmap_service = HeatmapService()
+social_data_service = SocialDataService()
+chart_service = ChartService()
 
 # --- Trend Scout Tools ---
 
 @tool
-def search_web(query: str, max_results: int = 5) -> str:
+async def search_web(query: str, max_results: int = 5) -> str:
     """
     Search the internet for up-to-date information on a given topic.
     Useful for finding news, trends, or broad information.
@@ -41,7 +45,7 @@ def search_web(query: str, max_results: int = 5) -> str:
     try:
         if not tavily_client:
             return "Error: Tavily API Key not configured."
-        response = tavily_client.search(query, max_results=max_results)
+        response = await tavily_client.search(query, max_results=max_results)
         # Simplify response to string
         results = response.get("results", [])
         return "\n\n".join([f"Title: {r['title']}\nURL: {r['url']}\nContent: {r['content']}" for r in results])
@@ -58,34 +62,53 @@ async def scrape_website(url: str) -> str:
 
 # --- Context Engineer Tools ---
 
+def _search_vault_sync(query: str, user_id: int, mode: str, category: Optional[str]) -> list:
+    with SessionLocal() as session:
+        results = rag_service.search_vault(session, user_id, query, mode=mode, category=category)
+        if not results and category:
+            # Older entries may not be categorized yet
+            results = rag_service.search_vault(session, user_id, query, mode=mode)
+        return results
+
 @tool
-def search_vault(query: str, user_id: int) -> str: # User ID might need to be passed from context
+async def search_vault(query: str, user_id: int, mode: str = "hybrid", category: Optional[str] = None) -> str: # User ID might need to be passed from context
     """
     Search the internal KnowledgeVault (database) for previously stored information.
     Useful for recalling past research, guidelines, or facts.
+    mode: 'hybrid' (default, keywords + meaning), 'vector' (meaning only) or 'lexical' (exact keywords, hashtags, brand names).
+    category (optional): 'brand_voice', 'published_post', 'growth_report', 'research' or 'general'.
     """
-    # NOTE: This requires a DB session. We'll create a new one for the tool execution.
-    # In a prod environment, better to inject session or use a context manager.
-    with Session(engine) as session:
-        results = rag_service.search_vault(session, user_id, query)
-        if not results:
-            return "No relevant info found in vault."
-        return "\n\n".join([f"Content: {r.content_chunk}" for r in results])
+    if mode not in SEARCH_MODES:
+        mode = "hybrid"
+    if category not in VAULT_CATEGORIES:
+        category = None
+    # Query embedding + sync session: off the event loop
+    results = await asyncio.to_thread(_search_vault_sync, query, user_id, mode, category)
+    if not results:
+        return "No relevant info found in vault."
+    # Lexical hits have no vector distance; their rank score stands in
+    return "\n\n".join([
+        f"Content (relevance {r.score if r.score is not None else r.fusion_score:.2f}): {r.content_chunk}" for r in results
+    ])
 
 @tool
-def store_in_vault(content: str, user_id: int) -> str:
+async def store_in_vault(content: str, user_id: int, category: str = "general", source: Optional[str] = None) -> str:
     """
     Store a piece of information or research findings into the KnowledgeVault.
     Useful for saving successful posts, facts, or guidelines for future use.
+    category: 'brand_voice', 'published_post', 'growth_report', 'research' or 'general' (default).
     """
-    with Session(engine) as session:
-        rag_service.store_content(session, user_id, content)
-        return "Content successfully stored in KnowledgeVault."
+    if category not in VAULT_CATEGORIES:
+        category = "general"
+    # Write-behind: chunking/embedding happen in the vault ingest worker, off the agent's critical path
+    async with AsyncSessionLocal() as db:
+        await aenqueue_content(db, user_id, content, category=category, source=source or "agent")
+        return "Content queued for storage in KnowledgeVault."
 
 # --- Viral Critic Tools ---
 
 @tool
-def quality_checklist(draft: str) -> str:
+async def quality_checklist(draft: str) -> str:
     """
     Run a quality checklist on a draft post.
     Returns specific feedback.
@@ -101,7 +124,7 @@ def quality_checklist(draft: str) -> str:
     return "Checklist Failures:\n" + "\n".join(feedback)
 
 @tool
-def predict_virality_score(post_content: str, platform: str = "Twitter") -> float:
+async def predict_virality_score(post_content: str, platform: str = "Twitter") -> float:
     """
     Predicts the virality score (0.0 to 1.0) of a post draft using the ML model.
     """
@@ -116,23 +139,17 @@ def predict_virality_score(post_content: str, platform: str = "Twitter") -> floa
         "sentiment_score": 0.5 # Placeholder
     }
     
-    return ml_service.predict_virality(features)
+    scores = await asyncio.to_thread(ml_service.predict_virality_many, [features])
+    return scores[0]
 
 @tool
-def recommend_schedule(platform: str = "Twitter", topic_category: str = "General", follower_count: int = 0) -> str:
+async def recommend_schedule(platform: str = "Twitter", topic_category: str = "General", follower_count: int = 0) -> str:
     """
     Predicts the optimal posting schedule (Day & Time) based on platform and topic.
     Returns a list of top 3 recommended slots with predicted reach.
     """
-    features = {
-        "platform": platform,
-        "topic_category": topic_category,
-        "follower_count": follower_count,
-        "hour_of_day": 12, # Defaults, will be overridden by grid search
-        "day_of_week": "Monday"
-    }
-    
-    recs = ml_service.recommend_schedule(features)
+    # Looked up from the precomputed 168-slot heatmap (a miss computes it)
+    recs = await asyncio.to_thread(heatmap_service.top_slots, platform, topic_category, follower_count, k=3)
     if not recs:
         return "No recommendations available (Model skipped or data missing)."
         
@@ -143,73 +160,27 @@ def recommend_schedule(platform: str = "Twitter", topic_category: str = "General
     return "\n".join(output)
 
 # --- Helper for Social Data ---
-SOCIAL_DATA_PATH = os.path.join(settings.BASE_DIR, 'app', 'ml', 'data', 'Social Media Engagement Dataset.csv')
-
 def _get_user_data(user_id: int):
-    try:
-        if not os.path.exists(SOCIAL_DATA_PATH):
-            return None
-        df = pd.read_csv(SOCIAL_DATA_PATH)
-        # Ensure user_id column exists. If strictly ints in DB but string in CSV, cast.
-        # Check dataset structure from previous steps: user_id seems to be present.
-        # We'll filter assuming user_id matches.
-        # If user_id not found, we might return all or random for demo purposes if the specific ID isn't there.
-        # For now, distinct filtering:
-        user_df = df[df['user_id'] == str(user_id)] # Assuming mixed types or string in CSV
-        if user_df.empty:
-            # Fallback: cast to int
-             user_df = df[df['user_id'] == int(user_id)]
-        
-        if user_df.empty:
-             # Fallback for demo: return a random slice if specific user not found (as dataset is Kaggle generic)
-             # This prevents emptiness during testing
-             return df.sample(50)
-        return user_df
-    except Exception as e:
-        print(f"Data Access Error: {e}")
-        return None
+    # Memory-mapped, user_id-indexed view of the engagement dataset
+    return social_data_service.get_user_data(user_id)
 
 @tool
-def generate_growth_chart(user_id: int, period: str = "monthly") -> str:
+async def generate_growth_chart(user_id: int, period: str = "monthly") -> str:
     """
     Generates a social media growth chart for the user based on historical data.
-    Saves the chart as an image and returns the file path.
+    Saves the chart as an image and returns its URL.
     """
-    df = _get_user_data(user_id)
-    if df is None or df.empty:
-        return f"No data available to generate chart for User {user_id}."
-    
     try:
-        # Preprocessing
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
-        
-        # Plotting
-        plt.figure(figsize=(10, 6))
-        plt.plot(df['timestamp'], df['likes_count'], label='Likes', marker='o')
-        plt.plot(df['timestamp'], df['impressions'], label='Impressions', marker='x', linestyle='--')
-        
-        plt.title(f"Growth Chart for User {user_id}")
-        plt.xlabel("Date")
-        plt.ylabel("Engagement")
-        plt.legend()
-        plt.grid(True)
-        
-        # Save
-        charts_dir = os.path.join(settings.BASE_DIR, 'static', 'charts')
-        os.makedirs(charts_dir, exist_ok=True)
-        filename = f"growth_{user_id}_{uuid.uuid4().hex[:8]}.png"
-        filepath = os.path.join(charts_dir, filename)
-        
-        plt.savefig(filepath)
-        plt.close()
-        
-        return f"Chart generated successfully: {filepath}"
+        # Waits on the render pool on a cache miss
+        chart = await asyncio.to_thread(chart_service.get_growth_chart, user_id, period)
+        if chart is None:
+            return f"No data available to generate chart for User {user_id}."
+        return f"Chart generated successfully: {chart['url']}"
     except Exception as e:
         return f"Error plotting chart: {e}"
 
 @tool
-def post_to_platform(content: str, platform: str, schedule_time: str = "now") -> str:
+async def post_to_platform(content: str, platform: str, schedule_time: str = "now") -> str:
     """
     Publishes (or schedules) the content to the specified social media platform.
     Returns the status and a (mock) URL of the published post.
@@ -221,24 +192,8 @@ def post_to_platform(content: str, platform: str, schedule_time: str = "now") ->
     else:
         return f"SUCCESS: Post scheduled for {schedule_time} on {platform}. Ticket ID: {post_id}"
 
-@tool
-def monitor_social_media(user_id: int) -> str:
-    """
-    Monitors linked social media handles for recent activity and performance stats.
-    Returns a summary of recent posts from the dataset.
-    CHECK: Requires User to have linked accounts (SocialAccount).
-    """
-    # 1. Check Linked Accounts
-    with Session(engine) as session:
-        # Avoid circular import if possible, or import inside
-        linked = session.query(SocialAccount).filter(SocialAccount.user_id == user_id).all()
-        
-    if not linked:
-        return "No linked social accounts found. Please link your Twitter or LinkedIn account via the Dashboard (Auth Settings) to get real-time monitoring."
-        
-    linked_platforms = [acc.platform.value for acc in linked] # e.g., ['twitter']
-    
-    # 2. Get Data (filtered by linked platforms)
+def _summarize_activity(user_id: int, linked_platforms: List[str]) -> str:
+    # 2. Get Data (filtered by linked platforms); pandas work, run in a thread
     df = _get_user_data(user_id)
     if df is None or df.empty:
         return f"No social media activity found for User {user_id}."
@@ -247,7 +202,7 @@ def monitor_social_media(user_id: int) -> str:
         # Filter by platform
         # Note: Dataset has 'platform' column, we only show data for linked platforms
         # Normalize dataset platform to lowercase for comparison
-        df['platform_norm'] = df['platform'].str.lower()
+        df['platform_norm'] = df['platform'].astype(str).str.lower()
         
         # If simulation/demo, we might ignore this strict filter if dataset platform names don't match exactly 
         # but let's try to be "product-like"
@@ -257,7 +212,6 @@ def monitor_social_media(user_id: int) -> str:
              return f"Linked accounts ({', '.join(linked_platforms)}) found, but no recent data available in our cache."
              
         # Get last 5 posts
-        filtered_df['timestamp'] = pd.to_datetime(filtered_df['timestamp'])
         recent = filtered_df.sort_values('timestamp', ascending=False).head(5)
         
         summary = [f"**Monitoring Report for User {user_id} (Platforms: {', '.join(linked_platforms)})**"]
@@ -277,7 +231,26 @@ def monitor_social_media(user_id: int) -> str:
         return f"Error analyzing social data: {e}"
 
 @tool
-def save_draft_to_db(user_id: int, content: str, status: str = "draft", platform: str = "twitter", draft_id: int = None, scheduled_for: str = None) -> str:
+async def monitor_social_media(user_id: int) -> str:
+    """
+    Monitors linked social media handles for recent activity and performance stats.
+    Returns a summary of recent posts from the dataset.
+    CHECK: Requires User to have linked accounts (SocialAccount).
+    """
+    # 1. Check Linked Accounts
+    async with AsyncSessionLocal() as db:
+        linked = (await db.execute(
+            select(SocialAccount).where(SocialAccount.user_id == user_id)
+        )).scalars().all()
+        
+    if not linked:
+        return "No linked social accounts found. Please link your Twitter or LinkedIn account via the Dashboard (Auth Settings) to get real-time monitoring."
+        
+    linked_platforms = [acc.platform.value for acc in linked] # e.g., ['twitter']
+    return await asyncio.to_thread(_summarize_activity, user_id, linked_platforms)
+
+@tool
+async def save_draft_to_db(user_id: int, content: str, status: str = "draft", platform: str = "twitter", draft_id: int = None, scheduled_for: str = None) -> str:
     """
     Saves or updates a content draft in the database.
     Status options: 'draft', 'pending_approval', 'approved', 'published', 'rejected', 'scheduled'.
@@ -293,25 +266,27 @@ def save_draft_to_db(user_id: int, content: str, status: str = "draft", platform
             except:
                 pass # Fail silently or use current time if 'now'
         
-        with SessionLocal() as db:
+        async with AsyncSessionLocal() as db:
             # Upsert logic or Create
             if draft_id:
-                draft_obj = db.query(ContentDraft).filter(ContentDraft.id == draft_id).first()
+                draft_obj = await db.get(ContentDraft, draft_id)
                 if draft_obj:
                     draft_obj.content = content
                     draft_obj.status = status
                     if schedule_dt: draft_obj.scheduled_for = schedule_dt
-                    db.commit()
+                    await db.commit()
                     return f"Draft {draft_id} updated to status '{status}'."
             
             # Create new
             # ... (Project check)
-            project = db.query(Project).filter(Project.user_id == user_id, Project.name == "General").first()
+            project = (await db.execute(
+                select(Project).where(Project.user_id == user_id, Project.name == "General").limit(1)
+            )).scalars().first()
             if not project:
                 project = Project(user_id=user_id, name="General", description="Default project", status="active")
                 db.add(project)
-                db.commit()
-                db.refresh(project)
+                await db.commit()
+                await db.refresh(project)
                 
             new_draft = ContentDraft(
                 project_id=project.id,
@@ -321,8 +296,8 @@ def save_draft_to_db(user_id: int, content: str, status: str = "draft", platform
                 scheduled_for=schedule_dt
             )
             db.add(new_draft)
-            db.commit()
-            db.refresh(new_draft)
+            await db.commit()
+            await db.refresh(new_draft)
             return f"{new_draft.id}" # Return just ID
             
     except Exception as e:
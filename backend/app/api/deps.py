@@ -1,5 +1,5 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, WebSocket, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
@@ -79,3 +79,16 @@ def get_current_user_optional(
     user = db.query(User).filter(User.email == token_data).first()
     return user
 
+
+def get_current_user_ws(
+    websocket: WebSocket,
+    db: Session = Depends(get_db),
+    token: Optional[str] = Query(None)
+) -> Optional[User]:
+    """
+    WebSocket auth. Browsers can't set headers on the handshake, so the token may also come as ?token=.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    return get_current_user_optional(db=db, token=token)
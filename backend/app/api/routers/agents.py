@@ -1,30 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from app.api.deps import get_current_user
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.api.deps import get_current_user, get_current_user_ws
 from app.models.user_model import User
-from app.agents.graph import app as agent_app
-from app.agents.state import AgentState
+from app.agents.graph import get_agent_app
+from app.config.database import AsyncSessionLocal
+from app.services.agent_job_worker import enqueue_agent_job, latest_agent_job
+from app.services.agent_events import iter_agent_events, event_payload, sse_format
 from langchain_core.messages import HumanMessage
 import uuid
-import asyncio
-
-from app.schemas.agent_schema import AgentRequest
 
 router = APIRouter(prefix="/agent", tags=["Agent Workflow"])
 
-# In-memory store for background task results (Product should use DB/Redis)
-params_store = {}
-
-@router.post("/run")
-async def run_agent(
-    request: dict, 
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Start a new agent workflow (Drafting or Chat).
-    Returns a thread_id to track progress.
-    """
+async def _enqueue_run(request: dict, current_user: User) -> dict:
+    # A new thread, queued for the agent job workers
     thread_id = str(uuid.uuid4())
-    config = {"configurable": {"thread_id": thread_id}}
     
     initial_state = {
         "input": request.get("input", ""),
@@ -36,46 +27,59 @@ async def run_agent(
         "sentry_approval_status": "pending"
     }
     
-    # We kick off the run. 
-    # Since we want to return immediately, we can stream the first chunk or just return thread_id.
-    # For HITL, we need to execute until it pauses.
-    
-    # Run slightly asynchronously to let it reach Sentry or End
-    # In a real queue system (Celery), this would be offloaded.
-    # Here we await the first step to initialize.
-    
-    async for event in agent_app.astream(initial_state, config=config):
-        pass # Process until pause or end
-        
-    # Get current state after run
-    snapshot = agent_app.get_state(config)
+    async with AsyncSessionLocal() as db:
+        job = await enqueue_agent_job(db, current_user.id, thread_id, initial_state)
     
-    return {
-        "thread_id": thread_id, 
-        "next_step": snapshot.next,
-        "values": snapshot.values if snapshot.values else None
-    }
+    return {"thread_id": thread_id, "job_id": job.id, "status": "queued", "stream": f"/agent/stream/{thread_id}"}
+
+@router.post("/run")
+async def run_agent(
+    request: dict, 
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Start a new agent workflow (Drafting or Chat).
+    Returns a thread_id immediately; the run is queued for the agent job workers.
+    Follow it on /agent/stream/{thread_id} (or /agent/ws/{thread_id}), or poll /agent/status/{thread_id}.
+    """
+    return await _enqueue_run(request, current_user)
 
 @router.get("/status/{thread_id}")
 async def get_status(thread_id: str, current_user: User = Depends(get_current_user)):
     """
-    Get the current state of a workflow.
+    Get the current state of a workflow: queued / running / paused (awaiting approval) / done / failed.
     """
+    async with AsyncSessionLocal() as db:
+        job = await latest_agent_job(db, thread_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    
+    response = {
+        "thread_id": thread_id,
+        "status": job.status,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "next_step": None,
+        "values": None
+    }
+    if job.status in ("queued", "running"):
+        return response
+    
     config = {"configurable": {"thread_id": thread_id}}
-    snapshot = agent_app.get_state(config)
+    agent_app = await get_agent_app()
+    snapshot = await agent_app.aget_state(config)
     
-    if not snapshot.values:
-        return {"status": "completed_or_invalid", "values": None}
-        
-    return {
-        "next_step": snapshot.next,
-        "values": {
+    if snapshot.values:
+        response["next_step"] = snapshot.next
+        response["values"] = {
             "draft": snapshot.values.get("draft"),
             "analyst_report": snapshot.values.get("analyst_report"),
             "sentry_status": snapshot.values.get("sentry_approval_status"),
             "chat_history": [m.content for m in snapshot.values.get("chat_history", []) if isinstance(m, HumanMessage)]
         }
-    }
+    return response
 
 @router.post("/approve/{thread_id}")
 async def approve_draft(
@@ -85,29 +89,106 @@ async def approve_draft(
 ):
     """
     Approve or Reject a draft at the Sentry gate.
+    The resumed run is queued like /agent/run; poll /agent/status/{thread_id}.
     """
-    config = {"configurable": {"thread_id": thread_id}}
-    snapshot = agent_app.get_state(config)
-    
-    if not snapshot.values:
-        raise HTTPException(status_code=404, detail="Thread not found")
-    
-    action = approval.get("action", "reject")
-    status_update = "approved" if action == "approve" else "rejected"
-    
-    # Update state via new command
-    agent_app.update_state(config, {"sentry_approval_status": status_update})
+    async with AsyncSessionLocal() as db:
+        # Locked, so concurrent approvals of the same thread go one at a time
+        job = await latest_agent_job(db, thread_id, current_user.id, for_update=True)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Thread not found")
+        # The lock doesn't show a resume job queued by the approval we waited for; a fresh read does
+        latest = await latest_agent_job(db, thread_id, current_user.id)
+        if latest.id != job.id:
+            job = latest
+        if job.status != "paused":
+            raise HTTPException(status_code=409, detail=f"Thread is {job.status}, not awaiting approval")
+        
+        action = approval.get("action", "reject")
+        status_update = "approved" if action == "approve" else "rejected"
+        
+        # The worker applies the decision to the checkpointed state, then resumes the graph
+        job = await enqueue_agent_job(
+            db, current_user.id, thread_id, {"sentry_approval_status": status_update}, kind="resume"
+        )
     
-    # Resume execution
-    async for event in agent_app.astream(None, config=config):
+    return {"thread_id": thread_id, "job_id": job.id, "status": "queued"}
+
+@router.get("/stream/{thread_id}")
+async def stream_agent_events(
+    thread_id: str,
+    request: Request,
+    after: Optional[int] = Query(None, ge=0),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Server-sent events for a workflow: node results (scout, draft, critic score, analyst
+    report, sentry status), scripter / Guru tokens and job status changes, each with
+    its sequence number as the event id. Ends when the run pauses for approval,
+    finishes or fails; reconnect with ?after=<id> (or Last-Event-ID) to resume.
+    """
+    if after is None:
+        # EventSource sends the last id it saw when it reconnects
+        last_event_id = request.headers.get("last-event-id", "")
+        after = int(last_event_id) if last_event_id.isdigit() else 0
+    async with AsyncSessionLocal() as db:
+        if await latest_agent_job(db, thread_id, current_user.id) is None:
+            raise HTTPException(status_code=404, detail="Thread not found")
+
+    async def body():
+        async for event in iter_agent_events(thread_id, current_user.id, after):
+            if await request.is_disconnected():
+                break
+            yield sse_format(event)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws/{thread_id}")
+async def websocket_agent_events(
+    websocket: WebSocket,
+    thread_id: str,
+    after: int = Query(0, ge=0),
+    current_user: Optional[User] = Depends(get_current_user_ws)
+):
+    """
+    Same events as /agent/stream, as JSON messages over a WebSocket.
+    """
+    if current_user is None:
+        await websocket.close(code=1008)
+        return
+    async with AsyncSessionLocal() as db:
+        if await latest_agent_job(db, thread_id, current_user.id) is None:
+            await websocket.close(code=1008)
+            return
+
+    await websocket.accept()
+
+    async def send_events():
+        async for event in iter_agent_events(thread_id, current_user.id, after):
+            if event is not None:
+                # Waits for the socket to drain, so a slow client slows only its own reads
+                await websocket.send_json(event_payload(event))
+
+    async def wait_for_disconnect():
+        # Client messages are ignored; this only notices the client leaving while the job is idle
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    sender = asyncio.create_task(send_events())
+    watcher = asyncio.create_task(wait_for_disconnect())
+    try:
+        await asyncio.wait((sender, watcher), return_when=asyncio.FIRST_COMPLETED)
+        if sender.done():
+            sender.result()
+            await websocket.close()
+    except WebSocketDisconnect:
         pass
-        
-    # Get final result
-    snapshot = agent_app.get_state(config)
-    return {
-        "status": "resumed", 
-        "values": snapshot.values
-    }
+    finally:
+        for task in (sender, watcher):
+            task.cancel()
 
 @router.post("/chat")
 async def chat_with_guru(
@@ -116,24 +197,7 @@ async def chat_with_guru(
 ):
     """
     Direct endpoint for 'Guru' chat.
-    Conceptually similar to 'run' but optimized for synchronous response.
+    Queued like /agent/run (a new chat session every time for now); the reply arrives
+    on the returned stream as the guru node's event, and /agent/status reports the thread.
     """
-    # Reuse run logic but return the last message
-    thread_id = str(uuid.uuid4()) # New chat session every time for now (or pass thread_id)
-    config = {"configurable": {"thread_id": thread_id}}
-    
-    initial_state = {
-        "input": request.get("input", ""),
-        "user_id": current_user.id,
-        "model_provider": request.get("model_provider", "gemini"),
-        "chat_history": []
-    }
-    
-    response_text = ""
-    async for event in agent_app.astream(initial_state, config=config):
-        # In Guru flow, we want the final output
-        for k, v in event.items():
-            if "chat_history" in v:
-                response_text = v['chat_history'][-1].content
-                
-    return {"response": response_text, "thread_id": thread_id}
+    return await _enqueue_run(request, current_user)
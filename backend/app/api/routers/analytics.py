@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.api.deps import get_current_user
+from app.models.user_model import User
+from app.services.heatmap_service import HeatmapService, HOURS_OF_DAY, follower_bucket
+from app.services.ml_service import DAYS_OF_WEEK
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+heatmap_service = HeatmapService()
+
+@router.get("/heatmap")
+def get_posting_heatmap(
+    platform: str = "Twitter",
+    topic_category: str = "General",
+    follower_count: int = 0,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Predicted reach for every weekday/hour slot (7 x 24), served from the precomputed table.
+    """
+    grid = heatmap_service.get_heatmap(platform, topic_category, follower_count)
+    if grid is None:
+        raise HTTPException(status_code=503, detail="Reach model not available.")
+
+    return {
+        "platform": platform,
+        "topic_category": topic_category,
+        "follower_bucket": follower_bucket(follower_count),
+        "days": DAYS_OF_WEEK,
+        "hours": HOURS_OF_DAY,
+        "predicted_reach": grid.round(1).tolist(),
+        "top_slots": heatmap_service.top_slots(platform, topic_category, follower_count)
+    }
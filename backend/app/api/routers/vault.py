@@ -1,12 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.api.deps import get_db, get_current_user
 from app.models.user_model import User
 from app.models.vault_model import KnowledgeVault
+from app.config.database import SessionLocal
+from app.services.document_parser import detect_type, iter_document_text
+from app.services.vault_ingest_worker import enqueue_content, ingest_status
 from app.services.rag_service import RagService
+from app.services.embedding_registry import EmbeddingModelRegistry
+from app.services.embedding_batcher import batcher_stats
+from app.services.embedding_cache import embedding_cache_stats
+from app.services.vault_reembed_service import VaultReembedService
+from app.services.vault_search_cache import get_search_cache
 from pydantic import BaseModel
+import json
 
-from app.schemas.vault_schema import VaultItem, SearchQuery
+from app.schemas.vault_schema import VaultItem, SearchQuery, VaultDocumentIn, VaultCategory
+from app.models.vault_document_model import VaultDocument
 
 router = APIRouter(prefix="/vault", tags=["Knowledge Vault"])
 rag_service = RagService() # Generic service
@@ -19,20 +32,122 @@ def add_to_vault(
 ):
     """
     Add content to the Knowledge Vault for RAG.
+    Returns immediately; chunking and embedding happen in the background ingest worker.
     """
-    rag_service.store_content(db, current_user.id, item.content)
-    return {"message": "Content added to vault."}
+    job_id = enqueue_content(db, current_user.id, item.content, category=item.category, source=item.source or "api")
+    return {"message": "Content queued for vault.", "job_id": job_id}
+
+@router.get("/ingest/status")
+def get_ingest_status(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Pending / processing / done / failed counts for the user's queued vault writes.
+    """
+    return ingest_status(db, current_user.id)
     
+@router.post("/upload")
+def upload_to_vault(
+    file: UploadFile = File(...),
+    category: VaultCategory = Form("general"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream a PDF, HTML or text file into the vault.
+    The file is parsed and chunked incrementally, embedded and committed in fixed-size
+    batches, and progress is streamed back as newline-delimited JSON.
+    """
+    doc_type = detect_type(file.filename, file.content_type)
+    user_id = current_user.id
+
+    def progress():
+        # Own session: request-scoped dependencies are closed before the body streams
+        db = SessionLocal()
+        try:
+            yield json.dumps({"event": "started", "filename": file.filename, "type": doc_type}) + "\n"
+            segments = iter_document_text(file.file, doc_type)
+            for update in rag_service.ingest_stream(
+                db, user_id, segments, category=category, source=f"upload:{file.filename}"
+            ):
+                yield json.dumps(update) + "\n"
+        except Exception as e:
+            db.rollback()
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+        finally:
+            db.close()
+            file.file.close()
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+@router.put("/documents")
+def upsert_document(
+    document: VaultDocumentIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create or update a named document. Only changed chunks are re-embedded and written.
+    """
+    return rag_service.upsert_document(db, current_user.id, document.name, document.content, category=document.category)
+
+@router.get("/documents")
+def list_documents(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    List the user's vault documents.
+    """
+    docs = db.query(VaultDocument).filter(VaultDocument.user_id == current_user.id).order_by(VaultDocument.name).all()
+    return [
+        {"id": d.id, "name": d.name, "version": d.version, "chunk_count": d.chunk_count, "updated_at": d.updated_at}
+        for d in docs
+    ]
+
+@router.delete("/documents/{document_id}")
+def delete_document(
+    document_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Delete a document and the vault chunks only it was using.
+    """
+    if not rag_service.delete_document(db, current_user.id, document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"message": "Document deleted."}
+
 @router.get("/")
 def list_vault(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    prefix: Optional[str] = None,
+    q: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    List all content chunks in the vault.
+    List content chunks in the vault, oldest first, one page at a time.
+    Pass the last id you received as `after_id` for the next page (also sent as X-Next-After-Id).
+    Optional filters: `prefix` (chunk starts with) and `q` (full-text search).
     """
-    items = db.query(KnowledgeVault).filter(KnowledgeVault.user_id == current_user.id).all()
-    # Exclude embedding from response for performance
+    # Only id + content are selected; embeddings never leave the database
+    query = (
+        db.query(KnowledgeVault.id, KnowledgeVault.content_chunk)
+        .filter(KnowledgeVault.user_id == current_user.id)
+    )
+    if after_id is not None:
+        query = query.filter(KnowledgeVault.id > after_id)
+    if prefix:
+        query = query.filter(KnowledgeVault.content_chunk.startswith(prefix, autoescape=True))
+    if q:
+        query = query.filter(KnowledgeVault.content_tsv.op("@@")(func.websearch_to_tsquery("english", q)))
+
+    items = query.order_by(KnowledgeVault.id).limit(limit).all()
+    if len(items) == limit:
+        response.headers["X-Next-After-Id"] = str(items[-1].id)
     return [{"id": i.id, "content": i.content_chunk} for i in items]
 
 @router.post("/search")
@@ -42,7 +157,41 @@ def search_vault(
     current_user: User = Depends(get_current_user)
 ):
     """
-    Perform semantic search on the vault.
+    Search the vault: semantic ("vector"), keyword ("lexical") or both fused ("hybrid"),
+    optionally within one category.
+    """
+    results = rag_service.search_vault(
+        db, current_user.id, query.query, query.limit, mode=query.mode, category=query.category
+    )
+    return [
+        {"id": r.id, "content": r.content_chunk, "score": r.score, "distance": r.distance, "fusion_score": r.fusion_score}
+        for r in results
+    ]
+
+
+@router.get("/quantization")
+def quantization_report(
+    k: int = 10,
+    sample: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Recall@k / latency of quantized first-pass search vs exact search on your vault,
+    and the size of each vector index.
+    """
+    return rag_service.quantization_report(db, current_user.id, k=min(k, 100), sample=min(sample, 100))
+
+@router.get("/metrics")
+def vault_metrics(current_user: User = Depends(get_current_user)):
+    """
+    Embedding pipeline stats: model load time/memory, batcher queue depth / batch sizes,
+    embedding cache and search result cache hit rates, and re-embed job progress.
     """
-    results = rag_service.search_vault(db, current_user.id, query.query, query.limit)
-    return [{"content": r.content_chunk, "score": 0.0} for r in results] # Score depends on PGVector return
+    return {
+        "embedding_models": EmbeddingModelRegistry().stats(),
+        "embedding_batchers": batcher_stats(),
+        "embedding_caches": embedding_cache_stats(),
+        "search_cache": get_search_cache().stats(),
+        "reembed_job": VaultReembedService().status()
+    }
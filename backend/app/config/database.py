@@ -1,8 +1,26 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from app.config.settings import settings
 
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal=sessionmaker(autocommit=False,autoflush=False,bind=engine)
-Base=declarative_base()
\ No newline at end of file
+Base=declarative_base()
+
+def _async_url(url: str):
+    # Same database through psycopg 3's asyncio support
+    url = make_url(url)
+    if url.drivername in ("postgresql", "postgresql+psycopg2"):
+        url = url.set(drivername="postgresql+psycopg")
+    return url
+
+def libpq_url(url: str = None) -> str:
+    # For raw psycopg connections, which want a plain postgresql:// URL
+    url = make_url(url or settings.DATABASE_URL).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+# For code running on the event loop (agent nodes and tools)
+async_engine = create_async_engine(_async_url(settings.DATABASE_URL))
+AsyncSessionLocal=async_sessionmaker(async_engine,autoflush=False,expire_on_commit=False)
@@ -1,49 +1,147 @@
-from typing import Optional
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+import httpx
+from langchain.agents import create_agent
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_groq import ChatGroq
 from app.config.settings import settings
 
+GEMINI_MODEL = "gemini-3.0-flash"
+GROQ_MODEL = "llama3-70b-8192"
+
 class MultiModelFactory:
     """
     Factory to get the appropriate LLM based on the use case.
+
+    Chat models and compiled agents are built once per configuration and reused: they
+    hold no per-run state, and rebuilding them per node call meant a new HTTP pool
+    (and TLS handshake) plus a graph compile on every step of every run.
     """
-    
+    _models: Dict[Tuple[str, str, float, bool], BaseChatModel] = {}
+    _agents: Dict[Tuple[str, str, float], object] = {}
+    _lock = threading.Lock()
+    _http_client: Optional[httpx.Client] = None
+    _http_async_client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def _http_limits(cls) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_CONNECTIONS
+        )
+
+    @classmethod
+    def http_clients(cls) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        """
+        Keep-alive HTTP pools shared by every Groq model.
+        """
+        with cls._lock:
+            if cls._http_client is None:
+                timeout = httpx.Timeout(settings.LLM_HTTP_TIMEOUT_SECONDS)
+                cls._http_client = httpx.Client(limits=cls._http_limits(), timeout=timeout)
+                cls._http_async_client = httpx.AsyncClient(limits=cls._http_limits(), timeout=timeout)
+            return cls._http_client, cls._http_async_client
+
+    @classmethod
+    def get_chat_model(
+        cls,
+        provider: str,
+        temperature: float,
+        model: Optional[str] = None,
+        convert_system_message_to_human: bool = False
+    ) -> BaseChatModel:
+        """
+        Cached chat model for (provider, model, temperature, convert_system_message_to_human).
+
+        Args:
+            provider: 'gemini' (Google) or anything else for Groq
+            temperature: Creativity of the model
+            model: Overrides the provider's default model name
+            convert_system_message_to_human: Gemini only; folds the system prompt into the first human message
+        """
+        provider = "gemini" if provider.lower() == "gemini" else "groq"
+        model = model or (GEMINI_MODEL if provider == "gemini" else GROQ_MODEL)
+        key = (provider, model, float(temperature), convert_system_message_to_human)
+        llm = cls._models.get(key)
+        if llm is not None:
+            return llm
+
+        if provider == "gemini":
+            # The client (and its connection pool) lives on the instance, so caching the instance reuses it
+            llm = ChatGoogleGenerativeAI(
+                model=model,
+                temperature=temperature,
+                google_api_key=settings.GOOGLE_API_KEY or os.getenv("GOOGLE_API_KEY"),
+                convert_system_message_to_human=convert_system_message_to_human
+            )
+        else:
+            http_client, http_async_client = cls.http_clients()
+            llm = ChatGroq(
+                model_name=model,
+                temperature=temperature,
+                api_key=settings.GROQ_API_KEY or "missing_key", # Prevent empty string error during init, fail at call time
+                http_client=http_client,
+                http_async_client=http_async_client
+            )
+
+        with cls._lock:
+            # Another thread may have built it meanwhile; keep the first
+            return cls._models.setdefault(key, llm)
+
+    @classmethod
+    def get_agent(cls, role: str, provider: str, temperature: float, tools: Sequence):
+        """
+        Cached tool-calling agent for (role, provider, temperature). A role always
+        passes the same tools, so they aren't part of the key.
+        """
+        provider = "gemini" if provider.lower() == "gemini" else "groq"
+        key = (role, provider, float(temperature))
+        agent = cls._agents.get(key)
+        if agent is not None:
+            return agent
+
+        agent = create_agent(cls.get_chat_model(provider, temperature), tools=list(tools))
+        with cls._lock:
+            return cls._agents.setdefault(key, agent)
+
+    @classmethod
+    async def close(cls):
+        """
+        Drops cached models and agents and closes the shared HTTP pools (app shutdown).
+        """
+        with cls._lock:
+            cls._models.clear()
+            cls._agents.clear()
+            http_client, cls._http_client = cls._http_client, None
+            http_async_client, cls._http_async_client = cls._http_async_client, None
+        if http_client is not None:
+            http_client.close()
+        if http_async_client is not None:
+            await http_async_client.aclose()
+
     @staticmethod
     def get_llm(model_type: str = "fast", temperature: float = 0.7) -> BaseChatModel:
         """
         Returns an LLM instance based on model_type.
-        
+
         Args:
             model_type: 'creative' (Google Gemini) or 'fast' (Groq/Llama)
             temperature: Creativity of the model
         """
         if model_type == "creative":
             # Uses Google Gemini for high-quality, complex reasoning tasks
-            return ChatGoogleGenerativeAI(
-                model="gemini-1.5-pro",
-                temperature=temperature,
-                google_api_key=settings.GOOGLE_API_KEY,
+            return MultiModelFactory.get_chat_model(
+                "gemini", temperature, model="gemini-1.5-pro",
                 convert_system_message_to_human=True # Sometimes needed for Gemini
             )
-            
+
         elif model_type == "fast":
             # Uses Groq for speed and short-form content
-            if not settings.GROQ_API_KEY:
-                 # Return a dummy wrapper or raising error is safer than crash, 
-                 # but for readiness check we want to avoid crash. 
-                 # Let's let it crash IF called, but verify if this is called on startup?
-                 # No, get_llm is usually called at runtime.
-                 # BUT, other files might call get_llm at module level.
-                 # Let's wrap it.
-                 pass
-            
-            return ChatGroq(
-                model_name="llama3-70b-8192",
-                temperature=temperature,
-                api_key=settings.GROQ_API_KEY or "missing_key" # Prevent empty string error during init, fail at call time
-            )
-            
+            return MultiModelFactory.get_chat_model("groq", temperature)
+
         else:
             raise ValueError(f"Unknown model_type: {model_type}")
 
@@ -0,0 +1,22 @@
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that marks content-addressed paths as immutable.
+    Files under `immutable_prefixes` never change once written (their name is a content hash),
+    so browsers and proxies may cache them indefinitely.
+    """
+
+    def __init__(self, *args, immutable_prefixes: tuple = (), max_age: int = 31536000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_prefixes = tuple(immutable_prefixes)
+        self.max_age = max_age
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        path = self.get_path(scope)
+        if path.startswith(self.immutable_prefixes):
+            response.headers["Cache-Control"] = f"public, max-age={self.max_age}, immutable"
+        return response
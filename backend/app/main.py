@@ -1,13 +1,63 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
-from app.api.routers import agents, oauth, auth, vault, posts, calendar 
+from app.core.static_files import CachedStaticFiles
+from app.api.routers import agents, oauth, auth, vault, posts, calendar, analytics
+from app.services.heatmap_service import HeatmapService
+from app.services.chart_service import ChartService
+from app.services.embedding_registry import EmbeddingModelRegistry
+from app.services.vault_ingest_worker import VaultIngestWorker
+from app.services.vault_reembed_service import VaultReembedService
+from app.services.rag_service import active_embedding_model
+from app.services.vault_quantization import QuantizedIndexManager
+from app.core.factory import MultiModelFactory
+from app.services.checkpoint_service import CheckpointService
+from app.services.agent_job_worker import AgentJobWorker
+from app.services.agent_events import AgentEventBroker
+from app.config.settings import settings
 # Import other existing routers if any (not shown in list_dir but likely exist)
 import os
 
 
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="StudioFlow AI Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.EMBEDDING_WARMUP:
+        EmbeddingModelRegistry().warmup([active_embedding_model()])
+
+    # Background jobs
+    heatmap_service = HeatmapService()
+    heatmap_service.start_background_refresh()
+    chart_service = ChartService()
+    chart_service.start_sweeper()
+    ingest_worker = VaultIngestWorker()
+    if settings.VAULT_QUEUE_WORKER_ENABLED:
+        ingest_worker.start()
+    if settings.VAULT_QUANTIZATION != "none":
+        QuantizedIndexManager().start_background_build()
+    # Resumes an interrupted re-embed job, if any
+    reembed_service = VaultReembedService()
+    reembed_service.start()
+    # Agent checkpoints: create tables up front, then keep them bounded
+    checkpoint_service = CheckpointService()
+    await checkpoint_service.open()
+    checkpoint_service.start_pruning()
+    agent_worker = AgentJobWorker()
+    if settings.AGENT_WORKER_ENABLED:
+        agent_worker.start()
+    AgentEventBroker().start()
+    yield
+    AgentEventBroker().stop()
+    await agent_worker.stop()
+    await checkpoint_service.close()
+    reembed_service.stop()
+    ingest_worker.stop()
+    chart_service.stop_sweeper()
+    chart_service.shutdown()
+    heatmap_service.stop_background_refresh()
+    await MultiModelFactory.close()
+
+app = FastAPI(title="StudioFlow AI Backend", lifespan=lifespan)
 
 # CORS Configuration
 origins = [
@@ -21,13 +71,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id"], # Vault list pagination cursor
 )
 
 # Mount Static Files for Charts
 static_dir = os.path.join(os.path.dirname(__file__), "..", "static")
 if not os.path.exists(static_dir):
     os.makedirs(static_dir)
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+# Chart filenames are content hashes, so they can be cached forever
+app.mount("/static", CachedStaticFiles(directory=static_dir, immutable_prefixes=("charts/",)), name="static")
 
 # Include Routers
 app.include_router(agents.router)
@@ -36,6 +88,7 @@ app.include_router(auth.router)
 app.include_router(vault.router)
 app.include_router(posts.router)
 app.include_router(calendar.router)
+app.include_router(analytics.router)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, ForeignKey, Index, JSON, UniqueConstraint
+from app.config.database import Base
+from datetime import datetime, timezone
+
+
+class AgentEvent(Base):
+    """
+    Progress of an agent workflow thread: node results, batched LLM tokens and job
+    status changes, numbered per thread by `seq` so streaming clients can resume
+    from the last event they saw.
+    """
+    __tablename__ = "agent_events"
+
+    id = Column(BigInteger, primary_key=True)
+
+    thread_id = Column(String(36), nullable=False)
+    seq = Column(Integer, nullable=False)
+
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    kind = Column(String(16), nullable=False) # node / token / status
+    node = Column(String(32), nullable=True)
+    data = Column(JSON, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+    __table_args__ = (
+        # Also the index for "events of this thread after seq N"
+        UniqueConstraint("thread_id", "seq", name="ux_agent_events_thread_seq"),
+        Index("ix_agent_events_created_at", "created_at"),
+    )
@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, JSON, text
+from app.config.database import Base
+from datetime import datetime, timezone
+
+
+class AgentJob(Base):
+    """
+    Queue of agent workflow executions, drained by AgentJobWorker. A workflow thread
+    gets one 'run' job and one 'resume' job per approval; its latest job is its status.
+    """
+    __tablename__ = "agent_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    thread_id = Column(String(36), nullable=False, index=True)
+
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    kind = Column(String(16), nullable=False, default="run") # run / resume
+    payload = Column(JSON, nullable=False) # Initial state (run) or the approval action (resume)
+
+    # queued / running / paused / done / failed; expired: paused past AGENT_CHECKPOINT_TTL_HOURS, thread deleted
+    status = Column(String(16), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Keeps the claim query cheap no matter how many finished rows accumulate
+        Index("ix_agent_jobs_queued", "id", postgresql_where=text("status = 'queued'")),
+        Index("ix_agent_jobs_user_status", "user_id", "status"),
+    )
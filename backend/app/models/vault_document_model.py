@@ -0,0 +1,70 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.config.database import Base
+from datetime import datetime, timezone
+
+
+class VaultDocument(Base):
+    """
+    A source document (e.g. brand guidelines) whose chunks live in knowledge_vault.
+    Chunks are linked by content hash, so re-submitting a document only touches the chunks that changed.
+    """
+    __tablename__ = "vault_documents"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    name = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    content_hash = Column(String(64), nullable=False)
+    chunk_count = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+    chunks = relationship(
+        "VaultDocumentChunk",
+        back_populates="document",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", name="uq_vault_documents_user_name"),
+    )
+
+
+class VaultDocumentChunk(Base):
+    __tablename__ = "vault_document_chunks"
+
+    document_id = Column(
+        Integer,
+        ForeignKey("vault_documents.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    position = Column(Integer, primary_key=True)
+
+    user_id = Column(Integer, nullable=False)
+    chunk_hash = Column(String(64), nullable=False)
+
+    document = relationship("VaultDocument", back_populates="chunks")
+
+    __table_args__ = (
+        # Orphan check on delete/update: is this chunk still used by any of the user's documents?
+        Index("ix_vault_document_chunks_user_hash", "user_id", "chunk_hash"),
+    )
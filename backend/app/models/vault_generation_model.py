@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey
+from app.config.database import Base
+
+
+class VaultGeneration(Base):
+    """
+    Per-user write counter for knowledge_vault. Bumped in the same transaction as any
+    insert or delete of the user's chunks; cached search results carry the generation
+    they were computed at and are ignored once it moves on.
+    """
+    __tablename__ = "vault_generations"
+
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    generation = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, text
+from app.config.database import Base
+from datetime import datetime, timezone
+
+
+class VaultIngestJob(Base):
+    """
+    Write-behind queue for vault storage. Rows are enqueued by `store_in_vault` and
+    `/vault/add` and drained in batches by VaultIngestWorker.
+    """
+    __tablename__ = "vault_ingest_queue"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    content = Column(Text, nullable=True) # Cleared once the item is done
+    category = Column(String(32), nullable=False, default="general", server_default="general")
+    source = Column(String(255), nullable=True)
+
+    status = Column(String, nullable=False, default="pending") # pending / processing / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+    # Not claimed before this; a retried item waits attempts * VAULT_QUEUE_RETRY_DELAY_SECONDS
+    available_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=text("now()"),
+        nullable=False
+    )
+
+    __table_args__ = (
+        # Keeps the claim query cheap no matter how many done rows accumulate
+        Index("ix_vault_ingest_queue_pending", "id", postgresql_where=text("status = 'pending'")),
+        Index("ix_vault_ingest_queue_user_status", "user_id", "status"),
+    )
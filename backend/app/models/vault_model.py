@@ -1,12 +1,64 @@
-from sqlalchemy import Column,Integer,String,ForeignKey
+from sqlalchemy import Column,Integer,String,Boolean,ForeignKey,Index,Computed,DateTime,Sequence,PrimaryKeyConstraint,text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from app.config.database import Base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from pgvector.sqlalchemy import Vector
+from app.config.settings import settings
+from datetime import datetime, timezone
+
+# "general" is the catch-all; every other category gets its own partial ANN index
+VAULT_CATEGORIES = ("general", "brand_voice", "published_post", "growth_report", "research")
+
 class KnowledgeVault(Base):
+    """
+    Hash-partitioned by user_id (see alembic d8a4b6e2f9c1): always filter on user_id so
+    queries are pruned to the user's partition and its indexes.
+    """
     __tablename__="knowledge_vault"
-    id=Column(Integer,primary_key=True,index=True)
+    id=Column(Integer,Sequence("knowledge_vault_id_seq"),nullable=False,index=True)
     user_id=Column(Integer,ForeignKey("users.id"),nullable=False)
     content_chunk=Column(String,nullable=False)
-    embedding=Column(Vector(384),nullable=False)
+    # Deferred: loading a KnowledgeVault entity shouldn't pull the vector unless it is used
+    embedding=deferred(Column(Vector(settings.EMBEDDING_DIM),nullable=False))
+    # Model that produced `embedding` (see VaultReembedService)
+    embedding_model=Column(String(128),nullable=True)
+    # sha256 of the whitespace-normalized, lowercased chunk; unique per user
+    content_hash=Column(String(64),nullable=True)
+    category=Column(String(32),nullable=False,default="general",server_default="general")
+    source=Column(String(255),nullable=True) # e.g. "upload:guide.pdf", "agent:engineer", "document:Brand Guide"
+    # Stored directly (/vault/add, uploads, agent tools), not only through a document:
+    # document updates / deletes never remove it (see alembic a1c5e9f3b7d2)
+    standalone=Column(Boolean,nullable=False,default=True,server_default=text("true"))
+    created_at=Column(DateTime(timezone=True),default=lambda: datetime.now(timezone.utc),server_default=text("now()"),nullable=False)
+    # Maintained by Postgres for lexical / hybrid search
+    content_tsv=deferred(Column(TSVECTOR,Computed("to_tsvector('english', content_chunk)",persisted=True)))
     
-    user = relationship("app.models.user_model.User", back_populates="knowledge_vault")
\ No newline at end of file
+    user = relationship("app.models.user_model.User", back_populates="knowledge_vault")
+
+    __table_args__ = (
+        # The partition key has to be part of the primary key; (user_id, id) also serves keyset listing
+        PrimaryKeyConstraint("user_id", "id", name="knowledge_vault_pkey"),
+        # ANN index for cosine search over normalized MiniLM vectors (see alembic 3f9a1c2b7d10)
+        Index(
+            "ix_knowledge_vault_embedding_ann",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        # Category-filtered searches only walk that category's graph (see alembic c7f2a9d4e1b0)
+        *(
+            Index(
+                f"ix_knowledge_vault_embedding_{category}",
+                "embedding",
+                postgresql_using="hnsw",
+                postgresql_with={"m": 16, "ef_construction": 64},
+                postgresql_ops={"embedding": "vector_cosine_ops"},
+                postgresql_where=text(f"category = '{category}'"),
+            )
+            for category in VAULT_CATEGORIES[1:]
+        ),
+        Index("ix_knowledge_vault_content_tsv", "content_tsv", postgresql_using="gin"),
+        Index("ux_knowledge_vault_user_content_hash", "user_id", "content_hash", unique=True),
+        {"postgresql_partition_by": "HASH (user_id)"},
+    )
\ No newline at end of file
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from app.config.database import Base
+from datetime import datetime, timezone
+
+
+class VaultReembedJob(Base):
+    """
+    Checkpoint for a background re-embedding of knowledge_vault into a new model.
+
+    `last_id` is the keyset cursor: every row with id <= last_id already has its
+    new vector in knowledge_vault.embedding_next, so a restarted job resumes from there.
+    The target model of the latest 'done' job is the model search queries are encoded with.
+    """
+    __tablename__ = "vault_reembed_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    target_model = Column(String(128), nullable=False)
+    dimension = Column(Integer, nullable=False)
+
+    status = Column(String, nullable=False, default="running") # running / indexing / cutover / done / failed
+    last_id = Column(Integer, nullable=False, default=0)
+    rows_done = Column(Integer, nullable=False, default=0)
+    cutover_id = Column(Integer, nullable=True) # max(knowledge_vault.id) when the columns were swapped
+    error = Column(Text, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
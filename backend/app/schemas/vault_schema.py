@@ -1,8 +1,20 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+VaultCategory = Literal["general", "brand_voice", "published_post", "growth_report", "research"]
 
 class VaultItem(BaseModel):
     content: str
+    category: VaultCategory = "general"
+    source: Optional[str] = None
     
 class SearchQuery(BaseModel):
     query: str
-    limit: int = 5
+    limit: int = Field(5, ge=1, le=50)
+    mode: Literal["vector", "lexical", "hybrid"] = "vector"
+    category: Optional[VaultCategory] = None
+
+class VaultDocumentIn(BaseModel):
+    name: str
+    content: str
+    category: VaultCategory = "general"
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, Optional, Set
+
+from langchain_core.messages import BaseMessage
+from sqlalchemy import select, text
+
+from app.config.database import AsyncSessionLocal, libpq_url
+from app.config.settings import settings
+from app.models.agent_event_model import AgentEvent
+from app.models.agent_job_model import AgentJob
+
+NOTIFY_CHANNEL = "agent_events"
+
+# Nodes whose LLM output is streamed token by token
+TOKEN_NODES = ("scripter", "guru")
+
+# What each node's event carries (the rest of its state update stays in the checkpoint)
+NODE_FIELDS = {
+    "scout": ("trend_data",),
+    "scripter": ("draft", "revision_count"),
+    "critic": ("virality_score", "is_good_enough", "critique"),
+    "analyst": ("analyst_report", "best_time"),
+    "sentry": ("sentry_approval_status",),
+    "engineer": ("engineer_report",),
+    "guru": ("chat_history", "error"),
+}
+
+TERMINAL_STATUSES = ("paused", "done", "failed", "expired")
+
+
+def _jsonable(value):
+    if isinstance(value, BaseMessage):
+        return value.content
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def node_event_data(node: str, update) -> dict:
+    if not isinstance(update, dict):
+        return {"value": _jsonable(update)}
+    fields = NODE_FIELDS.get(node)
+    data = {k: v for k, v in update.items() if fields is None or k in fields}
+    if node == "guru" and data.get("chat_history"):
+        # Only the reply, not the whole conversation
+        data["response"] = data.pop("chat_history")[-1]
+    return _jsonable(data)
+
+
+def _token_text(content) -> str:
+    # Gemini chunks may carry a list of parts
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+    return ""
+
+
+class AgentEventWriter:
+    """
+    Appends one job's events to agent_events and wakes up listeners (NOTIFY).
+    LLM tokens are buffered and written every AGENT_STREAM_TOKEN_FLUSH_MS, so a
+    streamed answer costs a handful of rows rather than one per token.
+    """
+
+    def __init__(self, thread_id: str, user_id: int, last_seq: int):
+        self.thread_id = thread_id
+        self.user_id = user_id
+        self.seq = last_seq
+        self._tokens: Dict[str, str] = {}
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    async def for_thread(cls, thread_id: str, user_id: int) -> "AgentEventWriter":
+        # A resumed thread continues its numbering
+        async with AsyncSessionLocal() as db:
+            last_seq = (await db.execute(
+                text("SELECT coalesce(max(seq), 0) FROM agent_events WHERE thread_id = :thread_id"),
+                {"thread_id": thread_id}
+            )).scalar()
+        return cls(thread_id, user_id, last_seq)
+
+    async def _write(self, events: list):
+        # Numbers are only taken once the rows commit, so a failed write leaves no gap in seq
+        rows = [
+            AgentEvent(
+                thread_id=self.thread_id, seq=self.seq + i, user_id=self.user_id, kind=kind, node=node, data=data
+            )
+            for i, (kind, node, data) in enumerate(events, start=1)
+        ]
+        if not rows:
+            return
+        async with AsyncSessionLocal() as db:
+            db.add_all(rows)
+            await db.execute(text("SELECT pg_notify(:channel, :thread_id)"), {
+                "channel": NOTIFY_CHANNEL, "thread_id": self.thread_id
+            })
+            await db.commit()
+        self.seq += len(rows)
+
+    def _pending_tokens(self) -> list:
+        events = [("token", node, {"text": chunk}) for node, chunk in self._tokens.items() if chunk]
+        self._tokens.clear()
+        self._last_flush = time.monotonic()
+        return events
+
+    async def token(self, node: str, content):
+        chunk = _token_text(content)
+        if not chunk:
+            return
+        self._tokens[node] = self._tokens.get(node, "") + chunk
+        if (time.monotonic() - self._last_flush) * 1000 >= settings.AGENT_STREAM_TOKEN_FLUSH_MS:
+            await self._write(self._pending_tokens())
+
+    async def emit(self, kind: str, node: Optional[str], data: dict):
+        # Buffered tokens go first, so the log stays in order
+        await self._write(self._pending_tokens() + [(kind, node, data)])
+
+
+class AgentEventBroker:
+    """
+    One LISTEN connection per process, fanning NOTIFYs out to the streams waiting
+    on that thread. Streams also poll, so a dropped notification only delays them.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AgentEventBroker, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._waiters: Dict[str, Set[asyncio.Event]] = {}
+            self._task: Optional[asyncio.Task] = None
+            self._initialized = True
+
+    def subscribe(self, thread_id: str) -> asyncio.Event:
+        wake = asyncio.Event()
+        self._waiters.setdefault(thread_id, set()).add(wake)
+        return wake
+
+    def unsubscribe(self, thread_id: str, wake: asyncio.Event):
+        waiters = self._waiters.get(thread_id)
+        if waiters is not None:
+            waiters.discard(wake)
+            if not waiters:
+                del self._waiters[thread_id]
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._listen())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _listen(self):
+        import psycopg
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(libpq_url(), autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    async for notify in conn.notifies():
+                        for wake in self._waiters.get(notify.payload, ()):
+                            wake.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Agent event listener error (streams fall back to polling): {e}")
+                await asyncio.sleep(settings.AGENT_STREAM_POLL_SECONDS)
+
+
+async def iter_agent_events(thread_id: str, user_id: int, after: int = 0) -> AsyncIterator[Optional[AgentEvent]]:
+    """
+    Yields the thread's events with seq > `after`, following it live until its job
+    pauses for approval, finishes or fails. Yields None while idle (heartbeat).
+
+    Events are read in batches only when the consumer asks for more, and no DB
+    connection is held in between, so a slow client holds back just its own reads.
+    """
+    broker = AgentEventBroker()
+    wake = broker.subscribe(thread_id)
+    try:
+        while True:
+            wake.clear()
+            async with AsyncSessionLocal() as db:
+                # Status first: a finished job wrote all of its events before its status
+                status = (await db.execute(
+                    select(AgentJob.status)
+                    .where(AgentJob.thread_id == thread_id, AgentJob.user_id == user_id)
+                    .order_by(AgentJob.id.desc())
+                    .limit(1)
+                )).scalar()
+                events = (await db.execute(
+                    select(AgentEvent)
+                    .where(AgentEvent.thread_id == thread_id, AgentEvent.user_id == user_id, AgentEvent.seq > after)
+                    .order_by(AgentEvent.seq)
+                    .limit(settings.AGENT_STREAM_BATCH_SIZE)
+                )).scalars().all()
+
+            for event in events:
+                yield event
+                after = event.seq
+            if events:
+                continue
+            if status is None or status in TERMINAL_STATUSES:
+                return
+            try:
+                await asyncio.wait_for(wake.wait(), settings.AGENT_STREAM_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                yield None
+    finally:
+        broker.unsubscribe(thread_id, wake)
+
+
+def event_payload(event: AgentEvent) -> dict:
+    return {"seq": event.seq, "kind": event.kind, "node": event.node, "data": event.data}
+
+
+def sse_format(event: Optional[AgentEvent]) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event.seq}\nevent: {event.kind}\ndata: {json.dumps(event_payload(event), default=str)}\n\n"
+
+
+async def prune_agent_events(max_age_hours: int) -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            text("DELETE FROM agent_events WHERE created_at < now() - make_interval(hours => :hours)"),
+            {"hours": max_age_hours}
+        )
+        await db.commit()
+        return result.rowcount
@@ -0,0 +1,274 @@
+import asyncio
+from typing import Optional
+
+from langchain_core.messages import AIMessageChunk
+from sqlalchemy import select, text, update, func
+
+from app.agents.graph import get_agent_app
+from app.config.database import AsyncSessionLocal
+from app.config.settings import settings
+from app.models.agent_job_model import AgentJob
+from app.services.agent_events import AgentEventWriter, NODE_FIELDS, TOKEN_NODES, node_event_data
+from app.services.checkpoint_service import checkpoint_time
+
+# Serializes claims across worker processes so the per-user cap can't be overshot
+CLAIM_LOCK_KEY = 0x6A6F6273
+
+# Oldest queued job per thread (a resume waits for its run), skipping users at their cap
+CLAIM_SQL = text("""
+    WITH running AS (
+        SELECT user_id, count(*) AS n FROM agent_jobs WHERE status = 'running' GROUP BY user_id
+    ), candidates AS (
+        SELECT j.id, row_number() OVER (PARTITION BY j.user_id ORDER BY j.id) + coalesce(r.n, 0) AS slot
+        FROM agent_jobs j
+        LEFT JOIN running r ON r.user_id = j.user_id
+        WHERE j.status = 'queued'
+          AND NOT EXISTS (
+              SELECT 1 FROM agent_jobs t
+              WHERE t.thread_id = j.thread_id AND t.id < j.id AND t.status IN ('queued', 'running')
+          )
+    )
+    UPDATE agent_jobs
+    SET status = 'running', attempts = attempts + 1, started_at = now(), updated_at = now()
+    WHERE id IN (SELECT id FROM candidates WHERE slot <= :per_user ORDER BY id LIMIT :limit)
+    RETURNING id, thread_id, user_id, kind, payload, attempts, created_at
+""")
+
+# Jobs left 'running' by a crashed worker (a live one times them out first)
+REQUEUE_STALE_SQL = text("""
+    UPDATE agent_jobs
+    SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'queued' END,
+        error = 'Worker stopped while running the job', updated_at = now()
+    WHERE status = 'running' AND started_at < now() - make_interval(secs => :timeout)
+""")
+
+
+async def enqueue_agent_job(db, user_id: int, thread_id: str, payload: dict, kind: str = "run") -> AgentJob:
+    """
+    Queues a workflow run (or an approval resume) for `thread_id`. Commits.
+    """
+    job = AgentJob(thread_id=thread_id, user_id=user_id, kind=kind, payload=payload, status="queued", attempts=0)
+    db.add(job)
+    await db.commit()
+    AgentJobWorker().notify()
+    return job
+
+
+async def latest_agent_job(db, thread_id: str, user_id: int, for_update: bool = False) -> Optional[AgentJob]:
+    """
+    The thread's most recent job (its current status), if the thread belongs to the user.
+    for_update locks that row until the transaction ends.
+    """
+    stmt = (
+        select(AgentJob)
+        .where(AgentJob.thread_id == thread_id, AgentJob.user_id == user_id)
+        .order_by(AgentJob.id.desc())
+        .limit(1)
+    )
+    if for_update:
+        stmt = stmt.with_for_update()
+    return (await db.execute(stmt)).scalars().first()
+
+
+def awaiting_approval(snapshot) -> bool:
+    # Paused at an interrupt, or the sentry left the draft pending for the user
+    values = snapshot.values or {}
+    return bool(snapshot.next) or (
+        values.get("sentry_approval_status") == "pending" and values.get("analyst_report") is not None
+    )
+
+
+class AgentJobWorker:
+    """
+    Runs queued agent workflows on the event loop, AGENT_WORKER_CONCURRENCY at a time.
+
+    Jobs are claimed from agent_jobs with at most AGENT_JOB_MAX_PER_USER running per
+    user across all workers. Workers run inside the API process (AGENT_WORKER_ENABLED)
+    and/or as dedicated processes: `python -m app.services.agent_job_worker`.
+    Within a process runs are asyncio tasks rather than subprocesses: they spend their
+    time waiting on LLM and DB I/O, so one event loop interleaves them; CPU-bound
+    tool work already runs in threads. Scale out by starting more worker processes.
+
+    A retried job continues from the thread's last checkpoint (see _resume_point),
+    so steps that completed, and their side effects, aren't replayed.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AgentJobWorker, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._loop: Optional[asyncio.AbstractEventLoop] = None
+            self._wake: Optional[asyncio.Event] = None
+            self._task: Optional[asyncio.Task] = None
+            self._running = set()
+            self._initialized = True
+
+    def notify(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # In-flight runs are cancelled and requeued
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        self._loop = None
+
+    def stats(self) -> dict:
+        return {"running": len(self._running), "concurrency": settings.AGENT_WORKER_CONCURRENCY}
+
+    async def _run(self):
+        while True:
+            try:
+                await self._requeue_stale()
+                free = settings.AGENT_WORKER_CONCURRENCY - len(self._running)
+                if free > 0:
+                    for job in await self._claim(free):
+                        task = asyncio.create_task(self._execute(job))
+                        self._running.add(task)
+                        task.add_done_callback(self._finished)
+            except Exception as e:
+                print(f"Agent job worker error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.AGENT_JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _finished(self, task: asyncio.Task):
+        self._running.discard(task)
+        # A slot (and maybe the user's cap) just freed up
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _requeue_stale(self):
+        async with AsyncSessionLocal() as db:
+            await db.execute(REQUEUE_STALE_SQL, {
+                "timeout": settings.AGENT_JOB_TIMEOUT_SECONDS + 60,
+                "max_attempts": settings.AGENT_JOB_MAX_ATTEMPTS
+            })
+            await db.commit()
+
+    async def _claim(self, limit: int) -> list:
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CLAIM_LOCK_KEY})
+            jobs = (await db.execute(CLAIM_SQL, {"per_user": settings.AGENT_JOB_MAX_PER_USER, "limit": limit})).all()
+            await db.commit()
+        return jobs
+
+    async def _execute(self, job):
+        try:
+            events = await AgentEventWriter.for_thread(job.thread_id, job.user_id)
+        except Exception as e:
+            print(f"Agent job {job.id}: event stream unavailable, running without it: {e}")
+            events = None
+        try:
+            await self._record(job, events, lambda ev: ev.emit(
+                "status", None, {"status": "running", "job_id": job.id, "kind": job.kind}
+            ))
+            agent_app = await get_agent_app()
+            config = {"configurable": {"thread_id": job.thread_id}}
+            inputs = await self._resume_point(agent_app, config, job)
+
+            async def run():
+                # Node results plus LLM tokens, recorded for /agent/stream as they happen
+                async for mode, chunk in agent_app.astream(
+                    inputs, config=config, durability=settings.AGENT_CHECKPOINT_DURABILITY,
+                    stream_mode=["updates", "messages"]
+                ):
+                    if mode == "messages":
+                        message, metadata = chunk
+                        # Namespace "guru:<task>|model:<task>": tokens of a node's inner agent count as the node's
+                        node = (metadata.get("langgraph_checkpoint_ns") or "").split(":")[0]
+                        if node in TOKEN_NODES and isinstance(message, AIMessageChunk):
+                            await self._record(job, events, lambda ev: ev.token(node, message.content))
+                    else:
+                        for node, update in chunk.items():
+                            if node in NODE_FIELDS:
+                                await self._record(job, events, lambda ev: ev.emit("node", node, node_event_data(node, update)))
+
+            if inputs is not False:
+                await asyncio.wait_for(run(), settings.AGENT_JOB_TIMEOUT_SECONDS)
+            snapshot = await agent_app.aget_state(config)
+            await self._finish(job, events, "paused" if awaiting_approval(snapshot) else "done")
+        except asyncio.CancelledError:
+            # Worker shutting down: hand the job straight back to the queue
+            await asyncio.shield(self._finish(job, events, "queued", error="Interrupted by worker shutdown"))
+            raise
+        except Exception as e:
+            print(f"Agent job {job.id} ({job.thread_id}) failed: {e}")
+            if isinstance(e, asyncio.TimeoutError):
+                e = TimeoutError(f"Timed out after {settings.AGENT_JOB_TIMEOUT_SECONDS}s")
+            status = "failed" if job.attempts >= settings.AGENT_JOB_MAX_ATTEMPTS else "queued"
+            await self._finish(job, events, status, error=str(e)[:2000])
+
+    async def _resume_point(self, agent_app, config: dict, job):
+        """
+        What to stream: the job's input, None to continue from the last checkpoint,
+        or False if an earlier attempt already got the graph to the end.
+        """
+        if job.attempts > 1:
+            snapshot = await agent_app.aget_state(config)
+            checkpoint_id = (snapshot.config or {}).get("configurable", {}).get("checkpoint_id")
+            # One job per thread at a time: a checkpoint newer than this job is an earlier attempt's progress
+            if checkpoint_id and checkpoint_time(checkpoint_id) >= job.created_at.timestamp():
+                return None if snapshot.next else False
+
+        if job.kind == "resume":
+            await agent_app.aupdate_state(config, job.payload)
+            return None
+        return job.payload
+
+    async def _record(self, job, events: Optional[AgentEventWriter], write):
+        # The stream is observability: a failed event write is logged, never fails (and retries) the run
+        if events is None:
+            return
+        try:
+            await write(events)
+        except Exception as e:
+            print(f"Could not record stream event for agent job {job.id}: {e}")
+
+    async def _finish(self, job, events: Optional[AgentEventWriter], status: str, error: str = None):
+        # Event before status: a stream that sees the final status has already seen every event
+        await self._record(job, events, lambda ev: ev.emit("status", None, {"status": status, "job_id": job.id, "error": error}))
+        await self._set_status(job.id, status, error=error)
+
+    async def _set_status(self, job_id: int, status: str, error: str = None):
+        values = {"status": status, "error": error, "updated_at": func.now()}
+        if status in ("paused", "done", "failed"):
+            values["finished_at"] = func.now()
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(AgentJob).where(AgentJob.id == job_id).values(**values))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    # Dedicated worker process; run several to scale out (set AGENT_WORKER_ENABLED=false on the API)
+    from app.services.checkpoint_service import CheckpointService
+
+    async def main():
+        await CheckpointService().open()
+        worker = AgentJobWorker()
+        worker.start()
+        print(f"Agent job worker running ({settings.AGENT_WORKER_CONCURRENCY} slots).")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await worker.stop()
+            await CheckpointService().close()
+
+    asyncio.run(main())
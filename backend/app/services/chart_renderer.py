@@ -0,0 +1,115 @@
+"""
+Chart rendering that runs inside the chart process pool.
+
+Everything here is a module-level function on plain numpy arrays so it can be
+pickled to worker processes. Rendering uses the Agg canvas and the
+object-oriented Figure API; nothing touches the global pyplot state.
+"""
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+PERIOD_RULES = {
+    "daily": "D",
+    "weekly": "W",
+    "monthly": "MS",
+}
+
+# Series at or below this many points are drawn with markers
+MARKER_MAX_POINTS = 60
+
+
+def init_worker():
+    matplotlib.use("Agg")
+
+
+def resample_series(timestamps: np.ndarray, values: dict, period: str) -> pd.DataFrame:
+    """
+    Sums each series per period bucket (daily / weekly / monthly).
+    """
+    rule = PERIOD_RULES.get((period or "").lower(), PERIOD_RULES["monthly"])
+    df = pd.DataFrame(values, index=pd.DatetimeIndex(timestamps))
+    df = df[df.index.notna()].sort_index()
+    return df.resample(rule).sum()
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Returns the indices of the `threshold` points that best preserve the shape of (x, y).
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    # Interior points split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        next_end = max(next_end, next_start + 1)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def render_growth_chart(
+    timestamps: np.ndarray,
+    likes: np.ndarray,
+    impressions: np.ndarray,
+    period: str,
+    title: str,
+    filepath: str,
+    max_points: int = 500,
+) -> str:
+    """
+    Aggregates by period, downsamples large series with LTTB and writes a PNG to filepath.
+    """
+    series = resample_series(timestamps, {"likes": likes, "impressions": impressions}, period)
+
+    x = series.index.asi8
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    for column, label, marker, linestyle in (
+        ("likes", "Likes", "o", "-"),
+        ("impressions", "Impressions", "x", "--"),
+    ):
+        y = series[column].to_numpy()
+        idx = lttb_indices(x, y, max_points)
+        ax.plot(
+            series.index[idx],
+            y[idx],
+            label=label,
+            marker=marker if len(idx) <= MARKER_MAX_POINTS else None,
+            linestyle=linestyle,
+        )
+
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Engagement")
+    ax.legend()
+    ax.grid(True)
+    fig.autofmt_xdate()
+
+    fig.savefig(filepath, format="png")
+    return filepath
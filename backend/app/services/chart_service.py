@@ -0,0 +1,214 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from app.config.settings import settings
+from app.services import chart_renderer
+from app.services.social_data_service import SocialDataService
+
+# Bump when the chart layout changes so old cached images are not reused
+CHART_RENDER_VERSION = "2"
+
+CHARTS_DIR = os.path.join(settings.BASE_DIR, 'static', 'charts')
+CHARTS_URL_PREFIX = "/static/charts"
+
+
+class ChartService:
+    """
+    Content-addressed cache of rendered growth charts.
+
+    A chart's filename is a hash of (user_id, period, data version), so the same
+    request against the same data returns the existing PNG without touching the
+    dataset or matplotlib, and the file at a given URL never changes (safe to
+    serve with immutable cache headers). A sweeper evicts by age and total size.
+
+    Rendering runs in a dedicated process pool (Agg backend, Figure API), so
+    charts render in parallel across cores and never block the caller's thread
+    on matplotlib. Concurrent requests for the same chart share one render.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ChartService, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.data_service = SocialDataService()
+            self.charts_dir = CHARTS_DIR
+            self._pool = None
+            self._pool_lock = threading.Lock()
+            self._inflight = {}
+            self._thread = None
+            self._stop = threading.Event()
+            self._initialized = True
+
+    @staticmethod
+    def chart_key(user_id, period: str, data_version: Optional[str]) -> str:
+        raw = f"{CHART_RENDER_VERSION}|{user_id}|{period}|{data_version}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:24]
+
+    def get_growth_chart(self, user_id: int, period: str = "monthly") -> Optional[dict]:
+        """
+        Returns {"path", "url", "cached"} for the user's growth chart, rendering it on a miss.
+        Returns None if there is no data to plot.
+        """
+        period = (period or "monthly").lower()
+        if period not in chart_renderer.PERIOD_RULES:
+            # The renderer draws unknown periods as monthly; one cache entry (and URL) for all of them
+            period = "monthly"
+        key = self.chart_key(user_id, period, self.data_service.data_version)
+        filename = f"growth_{key}.png"
+        filepath = os.path.join(self.charts_dir, filename)
+        url = f"{CHARTS_URL_PREFIX}/{filename}"
+
+        if os.path.exists(filepath):
+            # Refresh mtime so the size-based sweep evicts least recently used first
+            os.utime(filepath)
+            return {"path": filepath, "url": url, "cached": True}
+
+        future = self._submit_render(key, user_id, period, filepath)
+        if future.result(timeout=settings.CHART_RENDER_TIMEOUT_SECONDS) is None:
+            return None
+        return {"path": filepath, "url": url, "cached": False}
+
+    # --- Rendering ---
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.CHART_RENDER_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=chart_renderer.init_worker,
+                )
+            return self._pool
+
+    def _submit_render(self, key: str, user_id: int, period: str, filepath: str) -> Future:
+        """
+        Starts (or joins) the render for `key`. The future resolves to the chart's path,
+        or to None if there is no data to plot.
+        """
+        # Claim the key before any work, so only one render is ever started per key
+        with self._pool_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._inflight[key] = Future()
+
+        def _release():
+            with self._pool_lock:
+                self._inflight.pop(key, None)
+
+        try:
+            df = self.data_service.get_user_data(user_id)
+            if df is None or df.empty:
+                _release()
+                future.set_result(None)
+                return future
+
+            os.makedirs(self.charts_dir, exist_ok=True)
+            tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+            render = self._get_pool().submit(
+                chart_renderer.render_growth_chart,
+                df['timestamp'].to_numpy(dtype='datetime64[ns]'),
+                df['likes_count'].to_numpy(dtype=float),
+                df['impressions'].to_numpy(dtype=float),
+                period,
+                f"Growth Chart for User {user_id} ({period})",
+                tmp_path,
+                settings.CHART_MAX_POINTS,
+            )
+        except BaseException as e:
+            _release()
+            future.set_exception(e)
+            raise
+
+        # Publish the final file only once the worker has finished writing it
+        def _finish(f: Future):
+            try:
+                f.result()
+                os.replace(tmp_path, filepath)
+                result, error = filepath, None
+            except BaseException as e:
+                self._remove(tmp_path)
+                result, error = None, e
+            # Unregister first: a request arriving after this finds the file on disk
+            _release()
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+        render.add_done_callback(_finish)
+        return future
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    # --- Eviction ---
+
+    def sweep(self) -> int:
+        """
+        Deletes charts older than CHART_CACHE_MAX_AGE_SECONDS, then the least recently
+        used ones until the directory fits in CHART_CACHE_MAX_BYTES. Returns files removed.
+        """
+        if not os.path.isdir(self.charts_dir):
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for entry in os.scandir(self.charts_dir):
+            if not entry.is_file():
+                continue
+            st = entry.stat()
+            is_stale_tmp = entry.name.endswith('.tmp') and now - st.st_mtime > 300
+            if is_stale_tmp or now - st.st_mtime > settings.CHART_CACHE_MAX_AGE_SECONDS:
+                removed += self._remove(entry.path)
+            elif entry.name.endswith('.png'):
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= settings.CHART_CACHE_MAX_BYTES:
+                break
+            removed += self._remove(path)
+            total -= size
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def start_sweeper(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sweep_loop, name="chart-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+
+    def _sweep_loop(self):
+        while not self._stop.is_set():
+            try:
+                removed = self.sweep()
+                if removed:
+                    print(f"Chart cache sweep removed {removed} files.")
+            except Exception as e:
+                print(f"Chart sweep error: {e}")
+            self._stop.wait(settings.CHART_SWEEP_INTERVAL_SECONDS)
@@ -0,0 +1,266 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import select, text, update, func
+
+from app.config.database import AsyncSessionLocal, async_engine, libpq_url
+from app.config.settings import settings
+from app.models.agent_job_model import AgentJob
+from app.services.agent_events import prune_agent_events
+
+# Offset between the UUID epoch (1582-10-15) and the Unix epoch, in 100ns ticks
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+# One process prunes at a time (session advisory lock on the app database)
+PRUNE_LOCK_KEY = 0x636B7074
+
+# Checkpoint tables as created by the savers' setup(). Checkpoint ids sort by time; nothing
+# newer than the cutoff id is touched, as a live run may still be writing around it.
+_PG_PRUNE_SQL = (
+    """
+    DELETE FROM checkpoints c USING (
+        SELECT thread_id, checkpoint_ns, checkpoint_id,
+               row_number() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+        FROM checkpoints
+    ) r
+    WHERE c.thread_id = r.thread_id AND c.checkpoint_ns = r.checkpoint_ns
+      AND c.checkpoint_id = r.checkpoint_id AND r.rn > %(keep)s AND c.checkpoint_id < %(cutoff)s
+    """,
+    """
+    DELETE FROM checkpoint_writes w WHERE w.checkpoint_id < %(cutoff)s AND NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns AND c.checkpoint_id = w.checkpoint_id
+    )
+    """,
+    # Channel values are stored once per version and shared between checkpoints. aput writes a
+    # new version's blob before the checkpoint that references it, so a blob goes only once a
+    # checkpoint references a newer version of its channel (versions are zero-padded counters).
+    """
+    DELETE FROM checkpoint_blobs b WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+          AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+    ) AND EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+          AND c.checkpoint -> 'channel_versions' ->> b.channel > b.version
+    )
+    """,
+)
+
+_SQLITE_PRUNE_SQL = (
+    """
+    DELETE FROM checkpoints WHERE rowid IN (
+        SELECT rowid FROM (
+            SELECT rowid, checkpoint_id,
+                   row_number() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rn
+            FROM checkpoints
+        ) WHERE rn > :keep AND checkpoint_id < :cutoff
+    )
+    """,
+    """
+    DELETE FROM writes WHERE checkpoint_id < :cutoff AND NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns
+          AND c.checkpoint_id = writes.checkpoint_id
+    )
+    """,
+)
+
+_LATEST_PER_THREAD_SQL = "SELECT thread_id, max(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+
+
+def checkpoint_time(checkpoint_id: str) -> float:
+    """
+    Unix time a checkpoint was written, read from its id (a UUIDv6: timestamp in the high bits).
+    """
+    h = checkpoint_id.replace("-", "")
+    ticks = int(h[:12] + h[13:16], 16)
+    return (ticks - _UUID_EPOCH_OFFSET) / 1e7
+
+
+def checkpoint_id_at(unix_time: float) -> str:
+    """
+    Smallest checkpoint id written at `unix_time`: ids below it are older.
+    """
+    ticks = f"{int(unix_time * 1e7) + _UUID_EPOCH_OFFSET:015x}"
+    h = ticks[:12] + "6" + ticks[12:] + "0" * 16
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+class CheckpointService:
+    """
+    Owns the LangGraph checkpointer: Postgres (shared by all workers, so HITL approval
+    works whichever worker it lands on), SQLite as a local stand-in, or in-memory.
+    Keeps it bounded by pruning to the latest AGENT_CHECKPOINT_KEEP_LATEST checkpoints
+    per thread and deleting threads idle for AGENT_CHECKPOINT_TTL_HOURS.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CheckpointService, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.saver = None
+            self._pool = None
+            self._sqlite = None
+            self._open_lock = asyncio.Lock()
+            self._prune_task: Optional[asyncio.Task] = None
+            self._initialized = True
+
+    @property
+    def backend(self) -> str:
+        return settings.AGENT_CHECKPOINT_BACKEND
+
+    async def open(self):
+        """
+        Creates the saver (and its tables) on first use. Idempotent.
+        """
+        async with self._open_lock:
+            if self.saver is not None:
+                return self.saver
+
+            if self.backend == "postgres":
+                from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+                from psycopg.rows import dict_row
+                from psycopg_pool import AsyncConnectionPool
+
+                self._pool = AsyncConnectionPool(
+                    libpq_url(),
+                    max_size=settings.AGENT_CHECKPOINT_POOL_SIZE,
+                    kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                    open=False
+                )
+                await self._pool.open()
+                saver = AsyncPostgresSaver(self._pool)
+            elif self.backend == "sqlite":
+                import aiosqlite
+                from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+                os.makedirs(os.path.dirname(settings.AGENT_CHECKPOINT_SQLITE_PATH), exist_ok=True)
+                self._sqlite = await aiosqlite.connect(settings.AGENT_CHECKPOINT_SQLITE_PATH)
+                saver = AsyncSqliteSaver(self._sqlite)
+            elif self.backend == "memory":
+                # Per process and unbounded; tests / single-worker dev only
+                from langgraph.checkpoint.memory import MemorySaver
+                self.saver = MemorySaver()
+                return self.saver
+            else:
+                raise ValueError(f"Unknown AGENT_CHECKPOINT_BACKEND: {self.backend}")
+
+            await saver.setup()
+            self.saver = saver
+            print(f"Agent checkpoints: {self.backend}.")
+            return self.saver
+
+    async def close(self):
+        self.stop_pruning()
+        async with self._open_lock:
+            if self._pool is not None:
+                await self._pool.close()
+                self._pool = None
+            if self._sqlite is not None:
+                await self._sqlite.close()
+                self._sqlite = None
+            self.saver = None
+
+    # --- Pruning ---
+
+    async def _execute(self, sql: str, params: dict = None) -> list:
+        if self.backend == "postgres":
+            async with self._pool.connection() as conn:
+                cursor = await conn.execute(sql, params)
+                return await cursor.fetchall() if cursor.description else []
+        # AsyncSqliteSaver serializes access to its connection with this lock
+        async with self.saver.lock:
+            cursor = await self._sqlite.execute(sql, params or {})
+            rows = await cursor.fetchall()
+            await self._sqlite.commit()
+            return rows
+
+    async def prune(self) -> dict:
+        """
+        Deletes expired threads, then every checkpoint (and its writes / blobs) beyond
+        the latest AGENT_CHECKPOINT_KEEP_LATEST per thread. Stream events expire with them.
+        Every API and worker process schedules this; the first to take PRUNE_LOCK_KEY runs it.
+        """
+        async with async_engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if not (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": PRUNE_LOCK_KEY})).scalar():
+                return {"threads_deleted": 0, "skipped": True}
+            try:
+                return await self._prune()
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": PRUNE_LOCK_KEY})
+
+    async def _prune(self) -> dict:
+        await prune_agent_events(settings.AGENT_CHECKPOINT_TTL_HOURS)
+        if self.backend not in ("postgres", "sqlite"):
+            return {"threads_deleted": 0}
+        await self.open()
+
+        cutoff = time.time() - settings.AGENT_CHECKPOINT_TTL_HOURS * 3600
+        rows = await self._execute(_LATEST_PER_THREAD_SQL)
+        idle = []
+        for row in rows:
+            thread_id, latest = (row["thread_id"], row["max"]) if isinstance(row, dict) else row
+            if checkpoint_time(latest) < cutoff:
+                idle.append(thread_id)
+        expired = await self._expire_jobs(idle) if idle else []
+        for thread_id in expired:
+            await self.saver.adelete_thread(thread_id)
+
+        params = {
+            "keep": max(1, settings.AGENT_CHECKPOINT_KEEP_LATEST),
+            # No run lasts longer than its job timeout
+            "cutoff": checkpoint_id_at(time.time() - settings.AGENT_JOB_TIMEOUT_SECONDS),
+        }
+        for sql in _PG_PRUNE_SQL if self.backend == "postgres" else _SQLITE_PRUNE_SQL:
+            await self._execute(sql, params)
+        return {"threads_deleted": len(expired)}
+
+    async def _expire_jobs(self, thread_ids: list) -> list:
+        """
+        Of the idle threads, those that can go: a thread still awaiting approval has its
+        job marked expired first (so /agent/approve refuses it); one with a queued or
+        running job (e.g. an approval that just came in) is kept.
+        """
+        async with AsyncSessionLocal() as db:
+            latest = select(func.max(AgentJob.id)).where(AgentJob.thread_id.in_(thread_ids)).group_by(AgentJob.thread_id)
+            await db.execute(
+                update(AgentJob)
+                .where(AgentJob.id.in_(latest), AgentJob.status == "paused")
+                .values(status="expired", error="Approval window expired", updated_at=func.now(), finished_at=func.now())
+            )
+            await db.commit()
+            busy = set((await db.execute(
+                select(AgentJob.thread_id).distinct()
+                .where(AgentJob.thread_id.in_(thread_ids), AgentJob.status.in_(("queued", "running")))
+            )).scalars())
+        return [t for t in thread_ids if t not in busy]
+
+    def start_pruning(self):
+        if self._prune_task and not self._prune_task.done():
+            return
+
+        async def loop():
+            while True:
+                try:
+                    result = await self.prune()
+                    if result["threads_deleted"]:
+                        print(f"Pruned {result['threads_deleted']} expired agent threads.")
+                except Exception as e:
+                    print(f"Agent checkpoint prune failed: {e}")
+                await asyncio.sleep(settings.AGENT_CHECKPOINT_PRUNE_SECONDS)
+
+        self._prune_task = asyncio.create_task(loop())
+
+    def stop_pruning(self):
+        if self._prune_task:
+            self._prune_task.cancel()
+            self._prune_task = None
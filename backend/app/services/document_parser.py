@@ -0,0 +1,101 @@
+import codecs
+import os
+from html.parser import HTMLParser
+from typing import BinaryIO, Iterator, List
+
+READ_BLOCK_SIZE = 64 * 1024
+
+SUPPORTED_TYPES = ("pdf", "html", "text")
+
+
+def detect_type(filename: str = "", content_type: str = "") -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    content_type = (content_type or "").lower()
+    if ext == ".pdf" or "pdf" in content_type:
+        return "pdf"
+    if ext in (".html", ".htm") or "html" in content_type:
+        return "html"
+    return "text"
+
+
+class _StreamingTextExtractor(HTMLParser):
+    """
+    Incremental HTML -> text. Fed block by block; visible text is drained after each feed.
+    """
+    SKIP_TAGS = {"script", "style", "noscript", "template", "head"}
+    BLOCK_TAGS = {"p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "section", "article"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip_depth = 0
+        self._parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth and data.strip():
+            self._parts.append(data)
+
+    def drain(self) -> str:
+        text = "".join(self._parts)
+        self._parts = []
+        return text
+
+
+def _iter_text(file: BinaryIO) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        block = file.read(READ_BLOCK_SIZE)
+        if not block:
+            break
+        text = decoder.decode(block)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _iter_html(file: BinaryIO) -> Iterator[str]:
+    parser = _StreamingTextExtractor()
+    for text in _iter_text(file):
+        parser.feed(text)
+        drained = parser.drain()
+        if drained:
+            yield drained
+    parser.close()
+    drained = parser.drain()
+    if drained:
+        yield drained
+
+
+def _iter_pdf(file: BinaryIO) -> Iterator[str]:
+    from pypdf import PdfReader
+
+    # PdfReader reads pages lazily from the (disk-spooled) file object
+    reader = PdfReader(file)
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        if text.strip():
+            yield text + "\n\n"
+
+
+def iter_document_text(file: BinaryIO, doc_type: str) -> Iterator[str]:
+    """
+    Yields the document's text in segments without loading the whole file into memory.
+    """
+    if doc_type == "pdf":
+        return _iter_pdf(file)
+    if doc_type == "html":
+        return _iter_html(file)
+    return _iter_text(file)
@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List
+
+from app.config.settings import settings
+from app.services.embedding_registry import EmbeddingModelRegistry
+
+# Upper bounds of the batch-size histogram buckets (last bucket is open-ended)
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent encode requests for one model into batched `encode` calls.
+
+    Callers get a Future immediately. A dedicated worker thread waits for the
+    first request, keeps collecting for up to EMBEDDING_BATCH_WINDOW_MS or until
+    EMBEDDING_MAX_BATCH texts are queued, runs a single encode over all of them
+    and resolves each caller's future with its slice of the result.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.registry = EmbeddingModelRegistry()
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._pending_texts = 0
+        self._lock = threading.Lock()
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._batches = 0
+        self._texts = 0
+        self._wait_seconds = 0.0
+        self._encode_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name=f"embed-batcher-{model_name}", daemon=True)
+        self._thread.start()
+
+    # --- Public API ---
+
+    def submit(self, texts: List[str]) -> Future:
+        """
+        Queues texts for encoding. The future resolves to one vector (list of floats) per text.
+        """
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result([])
+            return request.future
+        with self._lock:
+            self._pending_texts += len(request.texts)
+        self._queue.put(request)
+        return request.future
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        return self.submit(texts).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            labels = [f"<={b}" for b in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+            return {
+                "queue_depth_requests": self._queue.qsize(),
+                "queue_depth_texts": self._pending_texts,
+                "batches": self._batches,
+                "texts": self._texts,
+                "avg_batch_size": round(self._texts / self._batches, 2) if self._batches else 0.0,
+                "avg_queue_wait_ms": round(1000 * self._wait_seconds / self._texts, 3) if self._texts else 0.0,
+                "avg_encode_ms": round(1000 * self._encode_seconds / self._batches, 3) if self._batches else 0.0,
+                "batch_size_histogram": dict(zip(labels, self._histogram)),
+            }
+
+    # --- Worker ---
+
+    def _collect(self) -> List[_Request]:
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.perf_counter() + settings.EMBEDDING_BATCH_WINDOW_MS / 1000.0
+        while size < settings.EMBEDDING_MAX_BATCH:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [t for r in batch for t in r.texts]
+            started = time.perf_counter()
+            try:
+                model = self.registry.get(self.model_name)
+                vectors = model.encode(
+                    texts,
+                    batch_size=settings.EMBEDDING_MAX_BATCH,
+                    normalize_embeddings=True,
+                ).tolist()
+            except Exception as e:
+                self._record(batch, texts, started)
+                for r in batch:
+                    r.future.set_exception(e)
+                continue
+
+            self._record(batch, texts, started)
+            offset = 0
+            for r in batch:
+                r.future.set_result(vectors[offset:offset + len(r.texts)])
+                offset += len(r.texts)
+
+    def _record(self, batch: List[_Request], texts: List[str], started: float):
+        n = len(texts)
+        bucket = next((i for i, b in enumerate(BATCH_SIZE_BUCKETS) if n <= b), len(BATCH_SIZE_BUCKETS))
+        with self._lock:
+            self._pending_texts -= n
+            self._histogram[bucket] += 1
+            self._batches += 1
+            self._texts += n
+            self._wait_seconds += sum((started - r.enqueued_at) * len(r.texts) for r in batch)
+            self._encode_seconds += time.perf_counter() - started
+
+
+_batchers: Dict[str, EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(model_name: str = None) -> EmbeddingBatcher:
+    """
+    Returns the process-wide batcher for a model, starting its worker on first use.
+    """
+    model_name = model_name or settings.EMBEDDING_MODEL
+    with _batchers_lock:
+        batcher = _batchers.get(model_name)
+        if batcher is None:
+            batcher = _batchers[model_name] = EmbeddingBatcher(model_name)
+        return batcher
+
+
+def batcher_stats() -> dict:
+    with _batchers_lock:
+        return {name: b.stats() for name, b in _batchers.items()}
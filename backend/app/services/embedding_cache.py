@@ -0,0 +1,179 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config.settings import settings
+
+# Disk hits refresh last_used only when it is older than this, so reads don't turn into writes
+LAST_USED_RESOLUTION_SECONDS = 3600
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache keyed by (model name, sha256(text)).
+
+    An in-memory LRU sits in front of a SQLite store on disk, so repeated text
+    (brand-voice queries, duplicate report chunks, repeated chat questions)
+    never pays the transformer cost twice, even across restarts. Vectors are
+    held as float32 arrays in memory and raw float32 bytes on disk, and only
+    become Python lists on the way out of get_many.
+    """
+
+    def __init__(self, model_name: str, path: str = None):
+        self.model_name = model_name
+        self.path = path or os.path.join(settings.CACHE_DIR, "embeddings.sqlite3")
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash BLOB NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used INTEGER NOT NULL,"
+            " PRIMARY KEY (model, text_hash)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+
+    # --- Lookup ---
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Returns the cached vector for each text, or None where it is not cached.
+        """
+        hashes = [text_hash(t) for t in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: Dict[bytes, List[int]] = {}
+
+        with self._lock:
+            for i, h in enumerate(hashes):
+                vector = self._memory.get(h)
+                if vector is not None:
+                    self._memory.move_to_end(h)
+                    results[i] = vector
+                    self._hits_memory += 1
+                else:
+                    missing.setdefault(h, []).append(i)
+
+            if missing and settings.EMBEDDING_CACHE_DISK_MAX_ROWS > 0:
+                found = self._read_disk(list(missing))
+                for h, vector in found.items():
+                    self._remember(h, vector)
+                    for i in missing.pop(h):
+                        results[i] = vector
+                        self._hits_disk += 1
+
+            self._misses += sum(len(idx) for idx in missing.values())
+        return [None if vector is None else vector.tolist() for vector in results]
+
+    def _read_disk(self, hashes: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found = {}
+        now = int(time.time())
+        stale = []
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            part = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = self._conn.execute(
+                f"SELECT text_hash, vector, last_used FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [self.model_name, *part],
+            ).fetchall()
+            for h, blob, last_used in rows:
+                found[bytes(h)] = np.frombuffer(blob, dtype=np.float32)
+                if now - last_used >= LAST_USED_RESOLUTION_SECONDS:
+                    stale.append(bytes(h))
+        if stale:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(now, self.model_name, h) for h in stale],
+            )
+        return found
+
+    # --- Store ---
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        now = int(time.time())
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                h = text_hash(text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(h, vector)
+                rows.append((self.model_name, h, vector.tobytes(), now))
+
+            if rows and settings.EMBEDDING_CACHE_DISK_MAX_ROWS > 0:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._writes_since_evict += len(rows)
+                if self._writes_since_evict >= 1000:
+                    self._evict_disk()
+
+    def _remember(self, h: bytes, vector: np.ndarray):
+        self._memory[h] = vector
+        self._memory.move_to_end(h)
+        while len(self._memory) > settings.EMBEDDING_CACHE_MEMORY_SIZE:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        """
+        Trims the on-disk store to EMBEDDING_CACHE_DISK_MAX_ROWS, dropping least recently used rows.
+        """
+        self._writes_since_evict = 0
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - settings.EMBEDDING_CACHE_DISK_MAX_ROWS
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE (model, text_hash) IN "
+                "(SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits_memory + self._hits_disk + self._misses
+            return {
+                "memory_entries": len(self._memory),
+                "hits_memory": self._hits_memory,
+                "hits_disk": self._hits_disk,
+                "misses": self._misses,
+                "hit_rate": round((self._hits_memory + self._hits_disk) / lookups, 4) if lookups else 0.0,
+            }
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name: str = None) -> EmbeddingCache:
+    model_name = model_name or settings.EMBEDDING_MODEL
+    with _caches_lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            cache = _caches[model_name] = EmbeddingCache(model_name)
+        return cache
+
+
+def embedding_cache_stats() -> dict:
+    with _caches_lock:
+        return {name: c.stats() for name, c in _caches.items()}
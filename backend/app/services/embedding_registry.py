@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sentence_transformers import SentenceTransformer
+
+
+def _process_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class EmbeddingModelRegistry:
+    """
+    Process-wide registry of SentenceTransformer models.
+
+    Each model is loaded once per process, on first use or via `warmup()`,
+    and shared by every RagService instance.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EmbeddingModelRegistry, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._models: Dict[str, SentenceTransformer] = {}
+            self._stats: Dict[str, dict] = {}
+            self._locks: Dict[str, threading.Lock] = {}
+            self._registry_lock = threading.Lock()
+            self._initialized = True
+
+    def get(self, model_name: str) -> SentenceTransformer:
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._registry_lock:
+            lock = self._locks.setdefault(model_name, threading.Lock())
+        with lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._load(model_name)
+        return model
+
+    def _load(self, model_name: str) -> SentenceTransformer:
+        rss_before = _process_rss_bytes()
+        start = time.perf_counter()
+        model = SentenceTransformer(model_name)
+        load_seconds = time.perf_counter() - start
+        rss_after = _process_rss_bytes()
+
+        param_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+        self._stats[model_name] = {
+            "load_seconds": round(load_seconds, 3),
+            "loaded_at": time.time(),
+            "dimension": model.get_sentence_embedding_dimension(),
+            "device": str(model.device),
+            "parameter_bytes": param_bytes,
+            "rss_delta_bytes": (rss_after - rss_before) if rss_before and rss_after else None,
+        }
+        self._models[model_name] = model
+        print(f"Embedding model '{model_name}' loaded in {load_seconds:.2f}s ({param_bytes / 1e6:.1f} MB params).")
+        return model
+
+    def warmup(self, model_names: List[str]):
+        """
+        Eagerly loads models (e.g. at startup) so the first request doesn't pay the load time.
+        """
+        for name in model_names:
+            self.get(name)
+
+    def is_loaded(self, model_name: str) -> bool:
+        return model_name in self._models
+
+    def stats(self) -> dict:
+        return {
+            "process_rss_bytes": _process_rss_bytes(),
+            "models": {name: dict(s) for name, s in self._stats.items()},
+        }
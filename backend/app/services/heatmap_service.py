@@ -0,0 +1,275 @@
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config.settings import settings
+from app.services.ml_service import MLService, DAYS_OF_WEEK
+
+HOURS_OF_DAY = list(range(24))
+
+# Follower buckets: [0, 1k), [1k, 10k), [10k, 100k), [100k, 1M), [1M, inf)
+FOLLOWER_BUCKET_EDGES = [1_000, 10_000, 100_000, 1_000_000]
+# Follower count each bucket is scored at (roughly its geometric middle)
+FOLLOWER_BUCKET_VALUES = [500, 3_000, 30_000, 300_000, 3_000_000]
+
+
+def follower_bucket(follower_count: int) -> int:
+    return bisect_right(FOLLOWER_BUCKET_EDGES, max(0, int(follower_count or 0)))
+
+
+class HeatmapService:
+    """
+    Precomputed reach for all 168 weekday/hour slots per
+    (platform, topic_category, follower bucket).
+
+    The table is a float32 array of shape (n_keys, 7, 24) persisted next to the
+    other caches and stamped with the reach_model.pkl signature it was built
+    from, so a retrained model invalidates it automatically. Only the configured
+    platforms and topics are persisted; other combinations are scored on demand
+    into a bounded in-memory LRU.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(HeatmapService, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.ml_service = MLService()
+            self.path = os.path.join(settings.CACHE_DIR, 'schedule_heatmap.npz')
+            self._lock = threading.RLock()
+            self._set_table([], np.zeros((0, 7, 24), dtype=np.float32), None)
+            self._extra: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+            # Model file signature whose load or rebuild failed, and when to try it again
+            self._failed_signature = None
+            self._retry_at = 0.0
+            self._thread = None
+            self._stop = threading.Event()
+            self._load()
+            self._initialized = True
+
+    # --- Persistence ---
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            data = np.load(self.path, allow_pickle=False)
+            signature = str(data['signature'])
+            if signature != MLService.current_reach_model_signature():
+                print("Heatmap cache is stale (reach model changed), will rebuild.")
+                return
+            keys = [
+                (str(p), str(t), int(b))
+                for p, t, b in zip(data['platforms'], data['topics'], data['buckets'])
+            ]
+            self._set_table(keys, data['reach'].astype(np.float32), signature)
+            print(f"Heatmap cache loaded: {len(keys)} keys.")
+        except Exception as e:
+            print(f"Error loading heatmap cache: {e}")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp.npz'
+            np.savez(
+                tmp_path,
+                signature=np.array(self._signature or ""),
+                platforms=np.array([k[0] for k in self._keys], dtype=str),
+                topics=np.array([k[1] for k in self._keys], dtype=str),
+                buckets=np.array([k[2] for k in self._keys], dtype=np.int8),
+                reach=self._reach,
+            )
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving heatmap cache: {e}")
+
+    def _set_table(self, keys, reach, signature):
+        index = {self._lookup_key(*k): i for i, k in enumerate(keys)}
+        # Swap as one tuple so lock-free readers never see a mismatched index/array
+        self._table = (index, list(keys), reach, signature)
+
+    @property
+    def _index(self):
+        return self._table[0]
+
+    @property
+    def _keys(self):
+        return self._table[1]
+
+    @property
+    def _reach(self):
+        return self._table[2]
+
+    @property
+    def _signature(self):
+        return self._table[3]
+
+    @staticmethod
+    def _lookup_key(platform: str, topic_category: str, bucket: int):
+        return (platform.lower(), topic_category.lower(), bucket)
+
+    # --- Scoring ---
+
+    def _score(self, keys: List[Tuple[str, str, int]]) -> np.ndarray:
+        """
+        Scores every slot of every key in a single reach model pass. Raises if the
+        model can't score them, so fallback values never end up in the table.
+        """
+        frames = [
+            self.ml_service.build_schedule_grid(
+                {
+                    "platform": platform,
+                    "topic_category": topic,
+                    "follower_count": FOLLOWER_BUCKET_VALUES[bucket],
+                },
+                DAYS_OF_WEEK,
+                HOURS_OF_DAY,
+            )
+            for platform, topic, bucket in keys
+        ]
+        reach = self.ml_service.predict_reach_frame(pd.concat(frames, ignore_index=True), raise_errors=True)
+        return np.asarray(reach, dtype=np.float32).reshape(len(keys), 7, 24)
+
+    def _configured_keys(self) -> List[Tuple[str, str, int]]:
+        return [
+            (platform, topic, bucket)
+            for platform in settings.HEATMAP_PLATFORMS
+            for topic in settings.HEATMAP_TOPICS
+            for bucket in range(len(FOLLOWER_BUCKET_VALUES))
+        ]
+
+    def is_stale(self) -> bool:
+        signature = MLService.current_reach_model_signature()
+        if signature == self._signature:
+            return False
+        # A model file that failed to load or score waits out its backoff
+        return signature != self._failed_signature or time.monotonic() >= self._retry_at
+
+    def rebuild(self):
+        """
+        Recomputes the table for the configured keys. A failure keeps the current
+        table and is retried after HEATMAP_REFRESH_SECONDS.
+        """
+        with self._lock:
+            self.ml_service.refresh_reach_model()
+            signature = MLService.current_reach_model_signature()
+            self._extra.clear()
+            if not self.ml_service.reach_model:
+                self._set_table([], np.zeros((0, 7, 24), dtype=np.float32), None)
+                if signature is not None:
+                    self._rebuild_failed(signature)
+                return
+            if self.ml_service.reach_model_signature != signature:
+                # Still serving the previous model; its table stays valid meanwhile
+                self._rebuild_failed(signature)
+                return
+
+            keys = self._configured_keys()
+            try:
+                reach = self._score(keys)
+            except Exception as e:
+                print(f"Heatmap rebuild failed: {e}")
+                self._rebuild_failed(signature)
+                return
+
+            self._failed_signature = None
+            self._set_table(keys, reach, signature)
+            self._save()
+            print(f"Heatmap rebuilt: {len(keys)} keys x 168 slots.")
+
+    def _rebuild_failed(self, signature):
+        self._failed_signature = signature
+        self._retry_at = time.monotonic() + settings.HEATMAP_REFRESH_SECONDS
+
+    def _extra_grid(self, platform: str, topic_category: str, bucket: int) -> Optional[np.ndarray]:
+        """
+        Grid for a combination outside the configured keys. Held in a bounded LRU and
+        never persisted, so arbitrary request values can't grow the table on disk.
+        """
+        with self._lock:
+            if self.is_stale():
+                self.rebuild()
+            if not self.ml_service.reach_model:
+                return None
+
+            lookup = self._lookup_key(platform, topic_category, bucket)
+            idx = self._index.get(lookup)
+            if idx is not None:
+                return self._reach[idx]
+            grid = self._extra.get(lookup)
+            if grid is not None:
+                self._extra.move_to_end(lookup)
+                return grid
+
+            try:
+                grid = self._score([(platform, topic_category, bucket)])[0]
+            except Exception as e:
+                # Served as the model's usual fallback, but not kept
+                print(f"Reach Prediction Error: {e}")
+                return np.zeros((7, 24), dtype=np.float32)
+            self._extra[lookup] = grid
+            while len(self._extra) > settings.HEATMAP_EXTRA_KEYS:
+                self._extra.popitem(last=False)
+            return grid
+
+    # --- Lookups ---
+
+    def get_heatmap(self, platform: str, topic_category: str, follower_count: int) -> Optional[np.ndarray]:
+        """
+        Returns the (7, 24) reach grid for the given context, or None if no model is loaded.
+        """
+        bucket = follower_bucket(follower_count)
+        index, _, reach, _ = self._table
+        idx = index.get(self._lookup_key(platform, topic_category, bucket))
+        if idx is None or self.is_stale():
+            return self._extra_grid(platform, topic_category, bucket)
+        return reach[idx]
+
+    def top_slots(self, platform: str, topic_category: str, follower_count: int, k: int = 3) -> list:
+        grid = self.get_heatmap(platform, topic_category, follower_count)
+        if grid is None:
+            return []
+        flat = grid.ravel()
+        top = np.argpartition(flat, -k)[-k:]
+        top = top[np.argsort(flat[top])[::-1]]
+        return [
+            {
+                "day": DAYS_OF_WEEK[i // 24],
+                "hour": int(i % 24),
+                "predicted_reach": float(flat[i]),
+            }
+            for i in top
+        ]
+
+    # --- Background Job ---
+
+    def start_background_refresh(self):
+        """
+        Starts a daemon thread that (re)builds the table whenever reach_model.pkl changes.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="heatmap-refresh", daemon=True)
+        self._thread.start()
+
+    def stop_background_refresh(self):
+        self._stop.set()
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.is_stale() or not self._keys:
+                    self.rebuild()
+            except Exception as e:
+                print(f"Heatmap refresh error: {e}")
+            self._stop.wait(settings.HEATMAP_REFRESH_SECONDS)
@@ -1,9 +1,12 @@
 import joblib
+import numpy as np
 import pandas as pd
 import os
 from typing import Dict, Any, List
 from app.config.settings import settings
-import copy
+
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+SCHEDULE_HOURS = [9, 12, 15, 18, 21]
 
 class MLService:
     _instance = None
@@ -19,6 +22,7 @@ class MLService:
             self.virality_metadata = None
             self.reach_model = None
             self.reach_metadata = None
+            self.reach_model_signature = None
             self._load_virality_model()
             self._load_reach_model()
             self._initialized = True
@@ -36,77 +40,128 @@ class MLService:
         except Exception as e:
             print(f"Error loading Virality Model: {e}")
 
+    @staticmethod
+    def reach_model_path() -> str:
+        return os.path.join(settings.BASE_DIR, 'ml', 'models', 'reach_model.pkl')
+
+    @classmethod
+    def current_reach_model_signature(cls):
+        """
+        Cheap identity of reach_model.pkl on disk (mtime + size), or None if missing.
+        """
+        try:
+            st = os.stat(cls.reach_model_path())
+        except OSError:
+            return None
+        return f"{st.st_mtime_ns}-{st.st_size}"
+
+    def refresh_reach_model(self) -> bool:
+        """
+        Reloads the reach model if the file on disk changed. Returns True if reloaded.
+        """
+        if self.current_reach_model_signature() == self.reach_model_signature:
+            return False
+        self._load_reach_model()
+        return True
+
     def _load_reach_model(self):
         try:
-            model_path = os.path.join(settings.BASE_DIR, 'ml', 'models', 'reach_model.pkl')
+            model_path = self.reach_model_path()
             meta_path = os.path.join(settings.BASE_DIR, 'ml', 'models', 'reach_metadata.pkl')
             if os.path.exists(model_path):
+                signature = self.current_reach_model_signature()
                 self.reach_model = joblib.load(model_path)
                 self.reach_metadata = joblib.load(meta_path)
+                self.reach_model_signature = signature
                 print("Reach Prediction Model Loaded.")
             else:
                 print("Reach Model not found.")
         except Exception as e:
             print(f"Error loading Reach Model: {e}")
 
-    def predict_virality(self, features: dict) -> float:
+    def predict_virality_many(self, features_list: List[dict]) -> List[float]:
         """
-        Predicts virality score (probability of being viral).
+        Predicts virality scores for many posts with a single model pass.
         """
+        if not features_list:
+            return []
         if not self.virality_model:
-            return 0.5 
+            return [0.5] * len(features_list)
         try:
-            df = pd.DataFrame([features])
-            proba = self.virality_model.predict_proba(df)[:, 1][0]
-            return float(proba)
+            df = pd.DataFrame.from_records(features_list)
+            proba = self.virality_model.predict_proba(df)[:, 1]
+            return [float(p) for p in proba]
         except Exception as e:
             print(f"Prediction Error: {e}")
-            return 0.0
+            return [0.0] * len(features_list)
 
-    def predict_reach(self, features: dict) -> float:
+    def predict_reach_many(self, features_list: List[dict]) -> List[float]:
         """
-        Predicts estimated impressions (Reach).
+        Predicts estimated impressions (Reach) for many candidates with a single model pass.
+        """
+        if not features_list:
+            return []
+        return self.predict_reach_frame(pd.DataFrame.from_records(features_list))
+
+    def predict_reach_frame(self, df: pd.DataFrame, raise_errors: bool = False) -> List[float]:
+        """
+        Predicts reach for every row of `df`. Errors fall back to 0.0 for each row,
+        unless `raise_errors` is set (for callers that store the result).
         """
         if not self.reach_model:
-            return 0.0
-        
+            if raise_errors:
+                raise RuntimeError("Reach model not loaded")
+            return [0.0] * len(df)
         try:
-            df = pd.DataFrame([features])
-            prediction = self.reach_model.predict(df)[0]
-            return max(0.0, float(prediction))
+            predictions = np.clip(np.asarray(self.reach_model.predict(df), dtype=float), 0.0, None)
+            return predictions.tolist()
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Reach Prediction Error: {e}")
-            return 0.0
+            return [0.0] * len(df)
+
+    def predict_virality(self, features: dict) -> float:
+        """
+        Predicts virality score (probability of being viral).
+        """
+        return self.predict_virality_many([features])[0]
+
+    def predict_reach(self, features: dict) -> float:
+        """
+        Predicts estimated impressions (Reach).
+        """
+        return self.predict_reach_many([features])[0]
+
+    def build_schedule_grid(self, base_features: dict, days: List[str], hours: List[int]) -> pd.DataFrame:
+        """
+        Expands base features into one row per (day, hour) candidate.
+        Rows are ordered day-major, so row i is days[i // len(hours)], hours[i % len(hours)].
+        """
+        base = dict(base_features)
+        # Ensure follower_count is present if model expects it
+        base.setdefault('follower_count', 0)
+
+        n = len(days) * len(hours)
+        df = pd.DataFrame.from_records([base] * n)
+        df['day_of_week'] = np.repeat(days, len(hours))
+        df['hour_of_day'] = np.tile(hours, len(days))
+        return df
 
-    def recommend_schedule(self, base_features: dict) -> list:
+    def recommend_schedule(self, base_features: dict, top_k: int = 3) -> list:
         """
         Predicts the best time and day to post by simulating all possibilities.
+        All candidates are scored in one batched model pass.
         """
         if not self.reach_model:
             return []
 
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        hours = [9, 12, 15, 18, 21] 
-        
-        predictions = []
-        
-        for day in days:
-            for hour in hours:
-                test_feat = copy.deepcopy(base_features)
-                test_feat['day_of_week'] = day
-                test_feat['hour_of_day'] = hour
-                
-                # Ensure follower_count is present if model expects it
-                if 'follower_count' not in test_feat:
-                     test_feat['follower_count'] = 0
-
-                reach = self.predict_reach(test_feat)
-                
-                predictions.append({
-                    "day": day,
-                    "hour": hour,
-                    "predicted_reach": reach
-                })
+        grid = self.build_schedule_grid(base_features, DAYS_OF_WEEK, SCHEDULE_HOURS)
+        reach = self.predict_reach_frame(grid)
 
+        predictions = [
+            {"day": day, "hour": int(hour), "predicted_reach": r}
+            for day, hour, r in zip(grid['day_of_week'], grid['hour_of_day'], reach)
+        ]
         predictions.sort(key=lambda x: x['predicted_reach'], reverse=True)
-        return predictions[:3]
+        return predictions[:top_k]
@@ -1,46 +1,741 @@
-from sentence_transformers import SentenceTransformer
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+import numpy as np
+from sqlalchemy import text, func, Float, Integer, cast, values, column, true, delete, exists, and_, or_, literal, update, case, bindparam, null
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import Session, select
-from app.models.vault_model import KnowledgeVault
+from pgvector.sqlalchemy import Vector
+from app.config.settings import settings
+from app.config.database import SessionLocal
+from app.models.vault_model import KnowledgeVault, VAULT_CATEGORIES
+from app.models.vault_reembed_model import VaultReembedJob
+from app.models.vault_generation_model import VaultGeneration
+from app.models.vault_document_model import VaultDocument, VaultDocumentChunk
+from app.services.embedding_registry import EmbeddingModelRegistry
+from app.services.embedding_batcher import get_batcher
+from app.services.embedding_cache import get_embedding_cache
+from app.services.vault_search_cache import get_search_cache, normalize_query
+from app.services.vault_quantization import QUANTIZATION_MODES, QuantizedIndexManager, quantized_distance
+from app.services.vault_indexes import pgvector_version
+
+def content_hash(chunk: str) -> str:
+    """
+    Exact-duplicate key for a chunk (must match the SQL backfill in alembic d5a8f3c6e214).
+    """
+    normalized = " ".join(chunk.split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def document_hash(content: str) -> str:
+    """
+    Change key for a whole document: exact, so case / formatting edits count as changes.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+@dataclass
+class VaultHit:
+    id: int
+    content_chunk: str
+    distance: Optional[float] # cosine distance, 0 = identical (None in lexical mode)
+    fusion_score: Optional[float] = None # reciprocal rank fusion score (hybrid mode)
+
+    @property
+    def score(self) -> Optional[float]:
+        # cosine similarity
+        return None if self.distance is None else 1.0 - self.distance
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Reciprocal rank fusion constant (Cormack et al.); dampens the weight of top ranks
+RRF_K = 60
+
+# pgvector's upper bound for hnsw.ef_search
+HNSW_MAX_EF_SEARCH = 1000
+
+# Exact-vs-ANN decisions per user, valid for one vault generation: user_id -> (generation, exact)
+EXACT_SCAN_DECISIONS_MAX = 10_000
+_exact_scan_lock = threading.Lock()
+_exact_scan_decisions: "OrderedDict[int, Tuple[int, bool]]" = OrderedDict()
+
+_active_model_lock = threading.Lock()
+_active_model = (None, 0.0) # (model name, monotonic time it was read)
+
+def active_embedding_model() -> str:
+    """
+    The model whose vectors are in knowledge_vault.embedding: the target of the last
+    completed re-embed job, or settings.EMBEDDING_MODEL. Re-read from the database at
+    most every VAULT_ACTIVE_MODEL_REFRESH_SECONDS.
+    """
+    global _active_model
+    name, read_at = _active_model
+    if name and time.monotonic() - read_at < settings.VAULT_ACTIVE_MODEL_REFRESH_SECONDS:
+        return name
+
+    with _active_model_lock:
+        name, read_at = _active_model
+        if name and time.monotonic() - read_at < settings.VAULT_ACTIVE_MODEL_REFRESH_SECONDS:
+            return name
+        try:
+            with SessionLocal() as db:
+                name = db.execute(
+                    select(VaultReembedJob.target_model)
+                    .where(VaultReembedJob.status == "done")
+                    .order_by(VaultReembedJob.id.desc())
+                    .limit(1)
+                ).scalar() or settings.EMBEDDING_MODEL
+        except Exception as e:
+            print(f"Could not read active embedding model, keeping {name or settings.EMBEDDING_MODEL}: {e}")
+            name = name or settings.EMBEDDING_MODEL
+        _active_model = (name, time.monotonic())
+        return name
+
+def set_active_embedding_model(name: str):
+    global _active_model
+    with _active_model_lock:
+        _active_model = (name, time.monotonic())
+
 class RagService:
-    def __init__(self):
-        self.model=SentenceTransformer("all-MiniLM-L6-v2")
+    def __init__(self, model_name: str = None):
+        # Models are shared process-wide and loaded on first use. Without an explicit
+        # model the service follows the vault's active model across re-embeds.
+        self._model_name = model_name
+        self.registry = EmbeddingModelRegistry()
         self.text_splitter=RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
             length_function=len,
             is_separator_regex=False
         )
+    @property
+    def model_name(self) -> str:
+        return self._model_name or active_embedding_model()
+
+    @property
+    def model(self):
+        return self.registry.get(self.model_name)
+
+    @property
+    def batcher(self):
+        return get_batcher(self.model_name)
+
+    @property
+    def embedding_cache(self):
+        return get_embedding_cache(self.model_name)
+
     def split_text(self,text):
         return self.text_splitter.split_text(text)
     def _get_embeddings(self,texts):
-        return self.model.encode(texts).tolist()
+        if isinstance(texts, str):
+            return self._get_embeddings([texts])[0]
+
+        # Cached vectors first; only misses go to the shared micro-batcher
+        model_name = self.model_name
+        cache = get_embedding_cache(model_name)
+        vectors = cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            computed = dict(zip(missing, get_batcher(model_name).encode(missing)))
+            cache.put_many(missing, [computed[t] for t in missing])
+            vectors = [v if v is not None else computed[t] for t, v in zip(texts, vectors)]
+        return vectors
+
+    def iter_chunks(self, segments: Iterable[str]) -> Iterator[str]:
+        """
+        Chunks a stream of text segments with the same splitter as split_text,
+        holding only a few chunks' worth of text in memory at a time.
+        """
+        window = CHUNK_SIZE * 8
+        buffer = ""
+        for segment in segments:
+            buffer += segment
+            if len(buffer) < window:
+                continue
+            chunks = self.split_text(buffer)
+            # The last chunk may be cut mid-sentence; carry it into the next window
+            yield from chunks[:-1]
+            buffer = chunks[-1] if chunks else ""
+        if buffer.strip():
+            yield from self.split_text(buffer)
+
+    def _insert_chunks(
+        self,
+        db: Session,
+        user_id: int,
+        chunks: List[str],
+        embeddings: List[List[float]],
+        near_duplicates: bool = True,
+        category: str = "general",
+        source: Optional[str] = None,
+        standalone: bool = True,
+    ) -> int:
+        """
+        Bulk-inserts chunk rows (executemany) without building ORM objects. Does not commit.
+
+        Duplicates are skipped: exact ones by (user_id, content_hash) via ON CONFLICT,
+        near-duplicates (cosine distance <= VAULT_NEAR_DUPLICATE_DISTANCE) against the
+        batch itself and against the user's existing rows through the ANN index.
+        The stored rows they duplicate are adopted instead (see _adopt_rows).
+
+        Rows go in windows of VAULT_INGEST_BATCH_SIZE: the in-memory comparison stays
+        within a window, and each window's ANN probe sees the rows earlier windows
+        inserted, so a large document costs linear rather than quadratic work.
+        Returns the number of rows inserted.
+        """
+        model_name = self.model_name
+        rows = {}
+        for chunk, embedding in zip(chunks, embeddings):
+            h = content_hash(chunk)
+            if chunk.strip() and h not in rows:
+                rows[h] = {
+                    "user_id": user_id, "content_chunk": chunk, "embedding": embedding,
+                    "content_hash": h, "embedding_model": model_name,
+                    "category": category, "source": source, "standalone": standalone,
+                }
+        rows = list(rows.values())
+        hashes = [r["content_hash"] for r in rows]
+
+        matched_ids = []
+        inserted = 0
+        window = max(1, settings.VAULT_INGEST_BATCH_SIZE)
+        for start in range(0, len(rows), window):
+            part = rows[start:start + window]
+            if near_duplicates and settings.VAULT_NEAR_DUPLICATE_DISTANCE > 0:
+                part, matched = self._drop_near_duplicates(db, user_id, part)
+                matched_ids += matched
+            if part:
+                result = db.execute(
+                    insert(KnowledgeVault)
+                    .on_conflict_do_nothing(index_elements=["user_id", "content_hash"])
+                    .returning(KnowledgeVault.id),
+                    part
+                )
+                inserted += len(result.all())
+
+        duplicates = or_(KnowledgeVault.content_hash.in_(hashes), KnowledgeVault.id.in_(matched_ids))
+        adopted = self._adopt_rows(db, user_id, duplicates, standalone=standalone, category=category) if hashes else 0
+        if inserted or adopted:
+            self._bump_generation(db, user_id)
+        return inserted
 
-    def store_content(self, db: Session, user_id: int, content: str):
+    def _adopt_rows(self, db: Session, user_id: int, condition, standalone: bool, category: str) -> int:
+        """
+        Applies a write that was deduplicated against stored rows to those rows: a direct
+        write marks them standalone, and a specific category replaces "general".
+        Returns the number of rows changed.
+        """
+        changes, needs_change = {}, []
+        if standalone:
+            changes["standalone"] = True
+            needs_change.append(~KnowledgeVault.standalone)
+        if category != "general":
+            changes["category"] = case((KnowledgeVault.category == "general", category), else_=KnowledgeVault.category)
+            needs_change.append(KnowledgeVault.category == "general")
+        if not changes:
+            return 0
+        result = db.execute(
+            update(KnowledgeVault)
+            .where(KnowledgeVault.user_id == user_id, condition, or_(*needs_change))
+            .values(**changes)
+        )
+        return result.rowcount
+
+    def _drop_near_duplicates(self, db: Session, user_id: int, rows: List[dict]):
+        """
+        Returns (rows that aren't near-duplicates, ids of the stored rows the others matched).
+        """
+        threshold = settings.VAULT_NEAR_DUPLICATE_DISTANCE
+
+        # Within the batch: one matrix product (vectors are unit-normalized, so cosine distance = 1 - dot)
+        matrix = np.asarray([r["embedding"] for r in rows], dtype=np.float32)
+        distances = 1.0 - matrix @ matrix.T
+        kept = []
+        for i in range(len(rows)):
+            if not kept or distances[i, kept].min() > threshold:
+                kept.append(i)
+        rows = [rows[i] for i in kept]
+
+        # Against stored rows: one nearest-neighbour ANN probe per candidate, in a single round trip
+        candidates = values(
+            column("idx", Integer), column("emb", Vector()), name="candidates"
+        ).data([(i, r["embedding"]) for i, r in enumerate(rows)])
+        candidate_vector = cast(candidates.c.emb, Vector())
+        exact = self._use_exact_scan(db, user_id, self._apply_search_tuning(db, 1))
+        candidate_distance = KnowledgeVault.embedding.cosine_distance(candidate_vector)
+        nearest = (
+            select(KnowledgeVault.id, candidate_distance.label("distance"))
+            .where(KnowledgeVault.user_id == user_id)
+            .order_by(self._distance_order(candidate_distance, exact))
+            .limit(1)
+            .lateral("nearest")
+        )
+        duplicates = {
+            r.idx: r.id
+            for r in db.execute(
+                select(candidates.c.idx, nearest.c.id, nearest.c.distance).select_from(candidates.join(nearest, true()))
+            )
+            if r.distance is not None and r.distance <= threshold
+        }
+        return [r for i, r in enumerate(rows) if i not in duplicates], list(set(duplicates.values()))
+
+    def store_content(self, db: Session, user_id: int, content: str, category: str = "general", source: Optional[str] = None):
         chunks = self.split_text(content)
         embeddings = self._get_embeddings(chunks)
-        
-        vault_entries = [
-            KnowledgeVault(
-                user_id=user_id,
-                content_chunk=chunk,
-                embedding=embedding
-            )
-            for chunk, embedding in zip(chunks, embeddings)
-        ]
-        
-        db.add_all(vault_entries)
+
+        self._insert_chunks(db, user_id, chunks, embeddings, category=category, source=source)
         db.commit()
 
-    def search_vault(self, db: Session, user_id: int, query: str, limit: int = 5):
-        query_embedding = self._get_embeddings(query)
-        
-        # Using pgvector's l2_distance
-        results = db.exec(
-            select(KnowledgeVault)
-            .where(KnowledgeVault.user_id == user_id)
-            .order_by(KnowledgeVault.embedding.l2_distance(query_embedding))
+    def ingest_stream(
+        self,
+        db: Session,
+        user_id: int,
+        segments: Iterable[str],
+        batch_size: int = None,
+        category: str = "general",
+        source: Optional[str] = None,
+    ) -> Iterator[dict]:
+        """
+        Chunks, embeds and stores a streamed document in fixed-size batches,
+        committing each batch in its own transaction. Yields a progress dict per batch.
+        """
+        batch_size = batch_size or settings.VAULT_INGEST_BATCH_SIZE
+        stored = 0
+        batch: List[str] = []
+
+        def flush():
+            nonlocal stored
+            embeddings = self._get_embeddings(batch)
+            stored += self._insert_chunks(db, user_id, batch, embeddings, category=category, source=source)
+            db.commit()
+            batch.clear()
+            return {"event": "progress", "chunks_stored": stored}
+
+        for chunk in self.iter_chunks(segments):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield flush()
+        if batch:
+            yield flush()
+        yield {"event": "done", "chunks_stored": stored}
+
+    # --- Documents ---
+
+    def upsert_document(self, db: Session, user_id: int, name: str, content: str, category: str = "general") -> dict:
+        """
+        Creates or updates a named document. Only chunks that are new to the user's
+        vault are embedded and inserted; chunks nothing uses anymore (no document, not
+        stored directly) are deleted.
+        """
+        # Concurrent upserts / deletes of the same document run one after another
+        self._lock_document(db, user_id, name)
+        doc_hash = document_hash(content)
+        doc = db.execute(
+            select(VaultDocument).where(VaultDocument.user_id == user_id, VaultDocument.name == name)
+        ).scalar_one_or_none()
+        if doc is not None and doc.content_hash == doc_hash:
+            return {"document_id": doc.id, "version": doc.version, "unchanged": True,
+                    "chunks_added": 0, "chunks_removed": 0, "chunks_embedded": 0}
+
+        chunks = self.split_text(content)
+        hashes = [content_hash(c) for c in chunks]
+        old_hashes = set()
+        if doc is not None:
+            old_hashes = set(db.execute(
+                select(VaultDocumentChunk.chunk_hash).where(VaultDocumentChunk.document_id == doc.id)
+            ).scalars())
+
+        added = set(hashes) - old_hashes
+        removed = old_hashes - set(hashes)
+
+        # Embed only chunks the user's vault doesn't already hold
+        stored = set()
+        if added:
+            stored = set(db.execute(
+                select(KnowledgeVault.content_hash)
+                .where(KnowledgeVault.user_id == user_id, KnowledgeVault.content_hash.in_(added))
+            ).scalars())
+        to_embed = {h: c for h, c in zip(hashes, chunks) if h in added and h not in stored}
+        if to_embed:
+            new_chunks = list(to_embed.values())
+            self._insert_chunks(
+                db, user_id, new_chunks, self._get_embeddings(new_chunks),
+                near_duplicates=False, category=category, source=f"document:{name}", standalone=False
+            )
+        if stored and self._adopt_rows(
+            db, user_id, KnowledgeVault.content_hash.in_(stored), standalone=False, category=category
+        ):
+            self._bump_generation(db, user_id)
+        # Chunks that match a stored row up to case / whitespace take the document's new text
+        # (the embedding model is uncased, so the vectors stay valid). Direct writes keep theirs.
+        reworded = [{"chunk_hash": h, "chunk_text": c} for h, c in zip(hashes, chunks) if h not in to_embed]
+        if reworded:
+            vault = KnowledgeVault.__table__
+            result = db.execute(
+                vault.update()
+                .where(
+                    vault.c.user_id == user_id,
+                    vault.c.content_hash == bindparam("chunk_hash"),
+                    vault.c.content_chunk != bindparam("chunk_text"),
+                    ~vault.c.standalone,
+                )
+                .values(content_chunk=bindparam("chunk_text")),
+                reworded
+            )
+            if result.rowcount:
+                self._bump_generation(db, user_id)
+
+        if doc is None:
+            doc = VaultDocument(user_id=user_id, name=name, version=1, content_hash=doc_hash, chunk_count=len(chunks))
+            db.add(doc)
+            db.flush()
+        else:
+            doc.version += 1
+            doc.content_hash = doc_hash
+            doc.chunk_count = len(chunks)
+            db.execute(delete(VaultDocumentChunk).where(VaultDocumentChunk.document_id == doc.id))
+
+        if chunks:
+            db.execute(
+                VaultDocumentChunk.__table__.insert(),
+                [
+                    {"document_id": doc.id, "position": i, "user_id": user_id, "chunk_hash": h}
+                    for i, h in enumerate(hashes)
+                ]
+            )
+        self._delete_orphaned_chunks(db, user_id, removed)
+        db.commit()
+
+        return {"document_id": doc.id, "version": doc.version, "unchanged": False,
+                "chunks_added": len(added), "chunks_removed": len(removed), "chunks_embedded": len(to_embed)}
+
+    def delete_document(self, db: Session, user_id: int, document_id: int) -> bool:
+        doc = db.execute(
+            select(VaultDocument).where(VaultDocument.id == document_id, VaultDocument.user_id == user_id)
+        ).scalar_one_or_none()
+        if doc is None:
+            return False
+        self._lock_document(db, user_id, doc.name)
+
+        hashes = set(db.execute(
+            select(VaultDocumentChunk.chunk_hash).where(VaultDocumentChunk.document_id == doc.id)
+        ).scalars())
+        db.execute(delete(VaultDocumentChunk).where(VaultDocumentChunk.document_id == doc.id))
+        db.execute(delete(VaultDocument).where(VaultDocument.id == doc.id))
+        self._delete_orphaned_chunks(db, user_id, hashes)
+        db.commit()
+        return True
+
+    def _lock_document(self, db: Session, user_id: int, name: str):
+        # Transaction-scoped, so it also covers a document that doesn't exist yet
+        db.execute(text("SELECT pg_advisory_xact_lock(:user_id, hashtext(:name))"), {"user_id": user_id, "name": name})
+
+    def _delete_orphaned_chunks(self, db: Session, user_id: int, hashes: set) -> int:
+        """
+        Deletes the user's vault rows for `hashes` that no document links to anymore
+        and that weren't also stored directly.
+        """
+        if not hashes:
+            return 0
+        still_linked = exists().where(
+            and_(
+                VaultDocumentChunk.user_id == user_id,
+                VaultDocumentChunk.chunk_hash == KnowledgeVault.content_hash,
+            )
+        )
+        result = db.execute(
+            delete(KnowledgeVault).where(
+                KnowledgeVault.user_id == user_id,
+                KnowledgeVault.content_hash.in_(hashes),
+                ~KnowledgeVault.standalone,
+                ~still_linked,
+            )
+        )
+        if result.rowcount:
+            self._bump_generation(db, user_id)
+        return result.rowcount
+
+    # --- Search ---
+
+    def _bump_generation(self, db: Session, user_id: int):
+        """
+        Invalidates the user's cached search results. Runs inside the writer's transaction,
+        so the new generation becomes visible together with the rows.
+        """
+        db.execute(
+            insert(VaultGeneration)
+            .values(user_id=user_id, generation=1)
+            .on_conflict_do_update(
+                index_elements=["user_id"],
+                set_={"generation": VaultGeneration.generation + 1}
+            )
+        )
+
+    def _vault_generation(self, db: Session, user_id: int) -> int:
+        return db.execute(
+            select(VaultGeneration.generation).where(VaultGeneration.user_id == user_id)
+        ).scalar() or 0
+
+    def _apply_search_tuning(self, db: Session, candidates: int) -> bool:
+        """
+        Per-transaction ANN recall/speed knobs (HNSW and IVFFlat) for a scan that must
+        return `candidates` rows. The user / category filter is applied to what the index
+        scan returns, so with a plain scan a small tenant can get fewer rows than asked
+        for, or none. Returns True if iterative scans (pgvector >= 0.8) cover that.
+        """
+        ef_search = min(HNSW_MAX_EF_SEARCH, max(settings.VAULT_HNSW_EF_SEARCH, candidates))
+        db.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+        db.execute(text(f"SET LOCAL ivfflat.probes = {int(settings.VAULT_IVFFLAT_PROBES)}"))
+        if pgvector_version(db.connection()) >= (0, 8):
+            # Keeps walking the graph until enough rows pass the filter
+            db.execute(text("SET LOCAL hnsw.iterative_scan = strict_order"))
+            return True
+        return False
+
+    def _use_exact_scan(self, db: Session, user_id: int, iterative: bool, generation: Optional[int] = None) -> bool:
+        """
+        Without iterative scans, users with at most VAULT_EXACT_SEARCH_MAX_ROWS rows are
+        searched exactly: cheap at that size, and never short of results. With a
+        `generation`, the decision is remembered until the user's vault next changes.
+        """
+        threshold = settings.VAULT_EXACT_SEARCH_MAX_ROWS
+        if iterative or threshold <= 0:
+            return False
+        if generation is not None:
+            with _exact_scan_lock:
+                cached = _exact_scan_decisions.get(user_id)
+                if cached is not None and cached[0] == generation:
+                    _exact_scan_decisions.move_to_end(user_id)
+                    return cached[1]
+
+        sample = select(KnowledgeVault.id).where(KnowledgeVault.user_id == user_id).limit(threshold + 1).subquery()
+        exact = db.execute(select(func.count()).select_from(sample)).scalar() <= threshold
+        if generation is not None:
+            with _exact_scan_lock:
+                _exact_scan_decisions[user_id] = (generation, exact)
+                _exact_scan_decisions.move_to_end(user_id)
+                while len(_exact_scan_decisions) > EXACT_SCAN_DECISIONS_MAX:
+                    _exact_scan_decisions.popitem(last=False)
+        return exact
+
+    @staticmethod
+    def _distance_order(distance, exact: bool):
+        # The ANN index only serves ORDER BY <bare distance operator>; "+ 0" forces an exact sort
+        return distance + 0 if exact else distance
+
+    def search_vault(
+        self,
+        db: Session,
+        user_id: int,
+        query: str,
+        limit: int = 5,
+        mode: str = "vector",
+        category: Optional[str] = None,
+    ):
+        """
+        Returns the `limit` best chunks as VaultHit(id, content_chunk, distance),
+        optionally restricted to one category (served by that category's partial ANN index).
+
+        mode:
+          - "vector": dense cosine search (ANN index; quantized first pass + re-rank if VAULT_QUANTIZATION is set)
+          - "lexical": full-text search (GIN index on content_tsv)
+          - "hybrid": both, merged with reciprocal rank fusion in a single query
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        if category is not None and category not in VAULT_CATEGORIES:
+            raise ValueError(f"Unknown vault category: {category}")
+
+        # Repeat queries (e.g. every "Brand Voice" lookup) are answered from memory until the vault changes
+        cache = get_search_cache()
+        generation = self._vault_generation(db, user_id)
+        cache_key = (user_id, normalize_query(query), limit, mode, category, self.model_name, generation)
+        hits = cache.get(cache_key)
+        if hits is not None:
+            return hits
+
+        if mode == "lexical":
+            # Full-text only: no query embedding, no ANN scan to tune
+            query_embedding, distance, exact = None, null(), False
+        else:
+            query_embedding = self._get_embeddings(query)
+            distance = KnowledgeVault.embedding.cosine_distance(query_embedding)
+            # Rows the ANN scan has to produce: the results, or hybrid's candidate list, times the re-rank shortlist
+            ann_rows = limit if mode == "vector" else self._hybrid_candidates(limit)
+            if settings.VAULT_QUANTIZATION != "none":
+                ann_rows *= settings.VAULT_RERANK_FACTOR
+            exact = self._use_exact_scan(db, user_id, self._apply_search_tuning(db, ann_rows), generation)
+
+        if mode == "vector":
+            nearest = self._nearest(user_id, query_embedding, limit, category=category, exact=exact).subquery("nearest")
+            stmt = (
+                select(KnowledgeVault.id, KnowledgeVault.content_chunk, nearest.c.distance)
+                # user_id as well as id: keeps the lookup pruned to the user's partition
+                .join(nearest, and_(KnowledgeVault.user_id == user_id, KnowledgeVault.id == nearest.c.id))
+                .order_by(nearest.c.distance)
+            )
+        else:
+            stmt = self._ranked_search(
+                user_id, query, query_embedding, distance, limit, hybrid=(mode == "hybrid"), category=category, exact=exact
+            )
+
+        rows = db.execute(stmt).all()
+
+        hits = [
+            VaultHit(
+                id=r.id,
+                content_chunk=r.content_chunk,
+                distance=float(r.distance) if r.distance is not None else None,
+                fusion_score=float(r.fusion_score) if getattr(r, "fusion_score", None) is not None else None,
+            )
+            for r in rows
+        ]
+        cache.put(cache_key, hits)
+        return hits
+
+    def _user_filter(self, user_id: int, category: Optional[str] = None):
+        conditions = [KnowledgeVault.user_id == user_id]
+        if category is not None:
+            # Inlined (not a bind parameter) so the planner can match the partial index's predicate
+            conditions.append(KnowledgeVault.category == literal(category, literal_execute=True))
+        return and_(*conditions)
+
+    def _nearest(
+        self,
+        user_id: int,
+        query_embedding: List[float],
+        limit: int,
+        quantization: str = None,
+        category: Optional[str] = None,
+        exact: bool = False,
+    ):
+        """
+        (id, distance) of the user's `limit` nearest chunks, ordered by full-precision distance.
+
+        With quantization on (and its index built), the first pass runs over the compact
+        index and VAULT_RERANK_FACTOR x limit candidates are re-ranked with the float32 vectors.
+        `exact` skips the indexes and sorts all of the user's rows.
+        """
+        quantization = quantization or settings.VAULT_QUANTIZATION
+        distance = KnowledgeVault.embedding.cosine_distance(query_embedding)
+        if exact or quantization == "none" or not QuantizedIndexManager().is_ready(quantization):
+            return (
+                select(KnowledgeVault.id, distance.label("distance"))
+                .where(self._user_filter(user_id, category))
+                .order_by(self._distance_order(distance, exact))
+                .limit(limit)
+            )
+
+        first_pass = quantized_distance(quantization, KnowledgeVault.embedding, query_embedding, len(query_embedding))
+        shortlist = (
+            select(KnowledgeVault.id, distance.label("distance"))
+            .where(self._user_filter(user_id, category))
+            .order_by(first_pass)
+            .limit(limit * settings.VAULT_RERANK_FACTOR)
+            .subquery("shortlist")
+        )
+        # Ordering the subquery's rows can't use an index, so this is an exact re-rank
+        return select(shortlist.c.id, shortlist.c.distance).order_by(shortlist.c.distance).limit(limit)
+
+    def quantization_report(self, db: Session, user_id: int, k: int = 10, sample: int = 20) -> dict:
+        """
+        Recall@k and latency of each available first-pass mode against exact search, using
+        `sample` of the user's own chunks as queries, plus the on-disk size of each index.
+        """
+        queries = db.execute(
+            select(KnowledgeVault.embedding).where(KnowledgeVault.user_id == user_id)
+            .order_by(func.random()).limit(sample)
+        ).scalars().all()
+        queries = [list(map(float, q)) for q in queries]
+
+        modes = ["none"] + [m for m in QUANTIZATION_MODES if m != "none" and QuantizedIndexManager().is_ready(m)]
+        recall = {m: 0.0 for m in modes}
+        latency = {m: 0.0 for m in modes}
+        for q in queries:
+            # Ground truth: brute force, no ANN index
+            db.execute(text("SET LOCAL enable_indexscan = off"))
+            db.execute(text("SET LOCAL enable_bitmapscan = off"))
+            exact = set(db.execute(self._nearest(user_id, q, k, quantization="none")).scalars())
+            db.rollback()
+
+            for m in modes:
+                self._apply_search_tuning(db, k * settings.VAULT_RERANK_FACTOR if m != "none" else k)
+                started = time.perf_counter()
+                found = set(db.execute(self._nearest(user_id, q, k, quantization=m)).scalars())
+                latency[m] += time.perf_counter() - started
+                db.rollback()
+                recall[m] += len(found & exact) / len(exact) if exact else 1.0
+
+        n = len(queries) or 1
+        return {
+            "configured": settings.VAULT_QUANTIZATION,
+            "k": k,
+            "queries": len(queries),
+            "recall_at_k": {m: round(recall[m] / n, 4) for m in modes},
+            "avg_latency_ms": {m: round(1000 * latency[m] / n, 3) for m in modes},
+            "index_bytes": QuantizedIndexManager().index_sizes(db.connection()),
+        }
+
+    @staticmethod
+    def _hybrid_candidates(limit: int) -> int:
+        return max(limit * 4, settings.VAULT_HYBRID_CANDIDATES)
+
+    def _ranked_search(
+        self,
+        user_id: int,
+        query: str,
+        query_embedding: Optional[List[float]],
+        distance,
+        limit: int,
+        hybrid: bool,
+        category: Optional[str] = None,
+        exact: bool = False,
+    ):
+        """
+        Lexical (and optionally vector) candidate lists as CTEs, fused with RRF in one statement.
+        """
+        candidates = self._hybrid_candidates(limit)
+        ts_query = func.websearch_to_tsquery("english", query)
+        lex_rank = func.ts_rank_cd(KnowledgeVault.content_tsv, ts_query)
+
+        lex = (
+            select(
+                KnowledgeVault.id.label("id"),
+                func.row_number().over(order_by=lex_rank.desc()).label("rank"),
+            )
+            .where(self._user_filter(user_id, category), KnowledgeVault.content_tsv.op("@@")(ts_query))
+            .order_by(lex_rank.desc())
+            .limit(candidates)
+            .cte("lex")
+        )
+        lex_score = func.coalesce(1.0 / cast(RRF_K + lex.c.rank, Float), 0.0)
+
+        if hybrid:
+            nearest = self._nearest(user_id, query_embedding, candidates, category=category, exact=exact).subquery("nearest")
+            vec = (
+                select(
+                    nearest.c.id.label("id"),
+                    func.row_number().over(order_by=nearest.c.distance).label("rank"),
+                )
+                .cte("vec")
+            )
+            vec_score = func.coalesce(1.0 / cast(RRF_K + vec.c.rank, Float), 0.0)
+            fused_id = func.coalesce(vec.c.id, lex.c.id)
+            source = vec.join(lex, vec.c.id == lex.c.id, full=True)
+            fusion = (vec_score + lex_score).label("fusion_score")
+        else:
+            fused_id = lex.c.id
+            source = lex
+            fusion = lex_score.label("fusion_score")
+
+        return (
+            select(KnowledgeVault.id, KnowledgeVault.content_chunk, distance.label("distance"), fusion)
+            .select_from(source.join(KnowledgeVault, and_(KnowledgeVault.user_id == user_id, KnowledgeVault.id == fused_id)))
+            .order_by(fusion.desc())
             .limit(limit)
-        ).all()
-        
-        return results
\ No newline at end of file
+        )
@@ -0,0 +1,145 @@
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from app.config.settings import settings
+
+SOCIAL_DATA_PATH = os.path.join(settings.BASE_DIR, 'app', 'ml', 'data', 'Social Media Engagement Dataset.csv')
+
+CATEGORICAL_COLUMNS = ['platform', 'topic_category']
+
+
+class SocialDataService:
+    """
+    Read-only access to the social engagement dataset.
+
+    The CSV is converted once into an uncompressed Arrow IPC file (typed columns,
+    categorical platform/topic, parsed timestamps, sorted by user_id). That file is
+    memory-mapped, so every worker process shares the same OS page cache instead
+    of holding its own parsed copy, and a user's rows are a zero-copy slice.
+    The Arrow file is rebuilt only when the CSV's mtime changes.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(SocialDataService, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.source_path = SOCIAL_DATA_PATH
+            self.cache_path = os.path.join(settings.CACHE_DIR, 'social_engagement.arrow')
+            self._lock = threading.Lock()
+            self._table: Optional[pa.Table] = None
+            self._offsets = {}
+            self._version = None
+            self._initialized = True
+
+    # --- Versioning ---
+
+    def _source_version(self) -> Optional[str]:
+        try:
+            st = os.stat(self.source_path)
+        except OSError:
+            return None
+        return f"{st.st_mtime_ns}-{st.st_size}"
+
+    @property
+    def data_version(self) -> Optional[str]:
+        """
+        Identity of the currently loaded source data (CSV mtime + size).
+        """
+        self._ensure_loaded()
+        return self._version
+
+    # --- Build / Load ---
+
+    def _build_cache(self, version: str):
+        df = pd.read_csv(self.source_path)
+        # Normalize user_id to one string type so lookups are a single exact match
+        df['user_id'] = df['user_id'].astype(str).str.strip()
+        if 'timestamp' in df.columns:
+            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+        for col in CATEGORICAL_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        sort_cols = ['user_id'] + (['timestamp'] if 'timestamp' in df.columns else [])
+        df = df.sort_values(sort_cols, kind='stable').reset_index(drop=True)
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b'source_version': version.encode(),
+        })
+
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, self.cache_path)
+        print(f"Social data cache built: {table.num_rows} rows.")
+
+    def _read_cache(self) -> Optional[pa.Table]:
+        if not os.path.exists(self.cache_path):
+            return None
+        source = pa.memory_map(self.cache_path, 'r')
+        return ipc.open_file(source).read_all()
+
+    def _ensure_loaded(self):
+        version = self._source_version()
+        if version is not None and version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            if version is None:
+                self._table, self._offsets, self._version = None, {}, None
+                return
+
+            table = self._read_cache()
+            cached_version = (table.schema.metadata or {}).get(b'source_version') if table is not None else None
+            if cached_version != version.encode():
+                self._build_cache(version)
+                table = self._read_cache()
+
+            # user_id is sorted, so each user owns one contiguous [start, end) range
+            user_ids = table.column('user_id').to_numpy(zero_copy_only=False)
+            uniques, starts = np.unique(user_ids, return_index=True)
+            ends = np.append(starts[1:], len(user_ids))
+            self._offsets = {u: (int(s), int(e)) for u, s, e in zip(uniques, starts, ends)}
+            self._table = table
+            self._version = version
+
+    # --- Access ---
+
+    def get_user_data(self, user_id, fallback_sample: int = 50) -> Optional[pd.DataFrame]:
+        """
+        Returns the user's rows (sorted by timestamp).
+        Falls back to a random sample when the user is not in the dataset,
+        since the dataset is a generic Kaggle export.
+        """
+        try:
+            self._ensure_loaded()
+            table = self._table
+            if table is None or table.num_rows == 0:
+                return None
+
+            span = self._offsets.get(str(user_id))
+            if span is not None:
+                start, end = span
+                return table.slice(start, end - start).to_pandas()
+
+            if not fallback_sample:
+                return None
+            rows = np.random.choice(table.num_rows, size=min(fallback_sample, table.num_rows), replace=False)
+            return table.take(pa.array(np.sort(rows))).to_pandas()
+        except Exception as e:
+            print(f"Data Access Error: {e}")
+            return None
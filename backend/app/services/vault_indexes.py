@@ -0,0 +1,109 @@
+from typing import List, Optional
+
+from sqlalchemy import text
+
+# knowledge_vault is hash-partitioned by user_id (alembic d8a4b6e2f9c1). Postgres can't build
+# an index CONCURRENTLY on a partitioned table, so online index builds go partition by partition.
+
+
+_pgvector_version = None
+
+
+def pgvector_version(conn) -> tuple:
+    """
+    (major, minor) of the installed pgvector, read once per process; (0, 0) if missing.
+    """
+    global _pgvector_version
+    if _pgvector_version is None:
+        version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+        _pgvector_version = tuple(int(p) for p in version.split(".")[:2]) if version else (0, 0)
+    return _pgvector_version
+
+
+def vault_partitions(conn) -> List[str]:
+    """
+    Names of knowledge_vault's partitions (empty if the table isn't partitioned).
+    """
+    return list(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'knowledge_vault'::regclass ORDER BY c.relname"
+    )).scalars())
+
+
+def index_state(conn, name: str) -> Optional[bool]:
+    """
+    None if the index doesn't exist, else whether it is valid.
+    """
+    return conn.execute(
+        text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+        {"name": name}
+    ).scalar()
+
+
+def _child_indexes(conn, name: str) -> dict:
+    # partition table name -> child index name
+    rows = conn.execute(
+        text(
+            "SELECT t.relname AS partition, c.relname AS child FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_index x ON x.indexrelid = c.oid "
+            "JOIN pg_class t ON t.oid = x.indrelid "
+            "WHERE i.inhparent = to_regclass(:name)"
+        ),
+        {"name": name}
+    ).all()
+    return {r.partition: r.child for r in rows}
+
+
+def _child_name(name: str, partition: str) -> str:
+    return f"{name}_{partition.replace('knowledge_vault_', '', 1)}"
+
+
+def create_vault_index_concurrently(conn, name: str, definition: str):
+    """
+    CREATE INDEX CONCURRENTLY `name` ON knowledge_vault `definition` (e.g. "USING hnsw (...) WHERE ...").
+
+    On the partitioned table: an invalid parent index is created ON ONLY the parent, each
+    partition's index is built concurrently and attached; the parent turns valid once all
+    are attached. Safe to re-run after a failure. `conn` must be in autocommit mode.
+    """
+    partitions = vault_partitions(conn)
+    if not partitions:
+        # A failed CONCURRENTLY build leaves an invalid index behind; IF NOT EXISTS would keep it
+        if index_state(conn, name) is False:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON knowledge_vault {definition}"))
+        return
+
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY knowledge_vault {definition}"))
+    attached = _child_indexes(conn, name)
+    for partition in partitions:
+        if partition in attached:
+            continue
+        child = _child_name(name, partition)
+        if index_state(conn, child) is False:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {child}"))
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} {definition}"))
+        conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+
+
+def rename_vault_index(conn, old: str, new: str):
+    """
+    Renames an index and, on the partitioned table, its per-partition children to match.
+    """
+    for partition, child in _child_indexes(conn, old).items():
+        conn.execute(text(f"ALTER INDEX {child} RENAME TO {_child_name(new, partition)}"))
+    conn.execute(text(f"ALTER INDEX {old} RENAME TO {new}"))
+
+
+def vault_relation_bytes(conn, name: str) -> Optional[int]:
+    """
+    On-disk size of a table or index, summed over partitions. None if it doesn't exist.
+    """
+    return conn.execute(
+        text(
+            "SELECT sum(pg_total_relation_size(relid)) FROM pg_partition_tree(to_regclass(:name)) "
+            "WHERE to_regclass(:name) IS NOT NULL"
+        ),
+        {"name": name}
+    ).scalar()
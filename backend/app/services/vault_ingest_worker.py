@@ -0,0 +1,197 @@
+import threading
+from datetime import timedelta
+from typing import List
+
+from sqlalchemy import text, func
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.models.vault_ingest_model import VaultIngestJob
+from app.services.rag_service import RagService
+
+CLAIM_SQL = text("""
+    UPDATE vault_ingest_queue
+    SET status = 'processing', attempts = attempts + 1, updated_at = now()
+    WHERE id IN (
+        SELECT id FROM vault_ingest_queue
+        WHERE status = 'pending' AND available_at <= now()
+        ORDER BY id
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, user_id, content, category, source, attempts
+""")
+
+# Items left in 'processing' by a crashed worker go back to the queue after this long,
+# unless they have used up their attempts (an item that kills the worker every time)
+REQUEUE_STALE_SQL = text("""
+    UPDATE vault_ingest_queue
+    SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'pending' END,
+        error = 'Worker stopped while processing the item', updated_at = now(),
+        available_at = now() + make_interval(secs => attempts * :retry_delay)
+    WHERE status = 'processing' AND updated_at < now() - make_interval(secs => :timeout)
+""")
+
+
+def enqueue_content(db, user_id: int, content: str, category: str = "general", source: str = None) -> int:
+    """
+    Queues content for vault storage and returns the queue item id. Commits.
+    """
+    job = VaultIngestJob(
+        user_id=user_id, content=content, category=category, source=source, status="pending", attempts=0
+    )
+    db.add(job)
+    db.commit()
+    VaultIngestWorker().notify()
+    return job.id
+
+
+async def aenqueue_content(db, user_id: int, content: str, category: str = "general", source: str = None) -> int:
+    """
+    enqueue_content for an AsyncSession.
+    """
+    job = VaultIngestJob(
+        user_id=user_id, content=content, category=category, source=source, status="pending", attempts=0
+    )
+    db.add(job)
+    await db.commit()
+    VaultIngestWorker().notify()
+    return job.id
+
+
+def ingest_status(db, user_id: int, failed_limit: int = 20) -> dict:
+    counts = dict(
+        db.query(VaultIngestJob.status, func.count(VaultIngestJob.id))
+        .filter(VaultIngestJob.user_id == user_id)
+        .group_by(VaultIngestJob.status)
+        .all()
+    )
+    failed = (
+        db.query(VaultIngestJob.id, VaultIngestJob.error, VaultIngestJob.attempts, VaultIngestJob.updated_at)
+        .filter(VaultIngestJob.user_id == user_id, VaultIngestJob.status == "failed")
+        .order_by(VaultIngestJob.id.desc())
+        .limit(failed_limit)
+        .all()
+    )
+    return {
+        "pending": counts.get("pending", 0),
+        "processing": counts.get("processing", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "failed_items": [
+            {"id": f.id, "error": f.error, "attempts": f.attempts, "updated_at": f.updated_at}
+            for f in failed
+        ]
+    }
+
+
+class VaultIngestWorker:
+    """
+    Background drainer for the vault_ingest_queue table.
+
+    Claims up to VAULT_QUEUE_BATCH_SIZE items with FOR UPDATE SKIP LOCKED (so any
+    number of worker processes can run side by side), embeds all of their chunks
+    in one batched call, bulk-inserts them and marks the items done in the same
+    transaction, dropping their content from the queue. Failed batches are retried
+    item by item; a failed item is retried after a growing delay, and one that keeps
+    failing (or keeps taking its worker down) is marked 'failed' after
+    VAULT_QUEUE_MAX_ATTEMPTS.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(VaultIngestWorker, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.rag_service = RagService()
+            self._wake = threading.Event()
+            self._stop = threading.Event()
+            self._thread = None
+            self._initialized = True
+
+    def notify(self):
+        self._wake.set()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="vault-ingest-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._requeue_stale()
+                while not self._stop.is_set() and self.drain_once():
+                    pass
+            except Exception as e:
+                print(f"Vault ingest worker error: {e}")
+            self._wake.wait(settings.VAULT_QUEUE_POLL_SECONDS)
+            self._wake.clear()
+
+    def _requeue_stale(self):
+        with SessionLocal() as db:
+            db.execute(REQUEUE_STALE_SQL, {
+                "timeout": settings.VAULT_QUEUE_VISIBILITY_TIMEOUT_SECONDS,
+                "max_attempts": settings.VAULT_QUEUE_MAX_ATTEMPTS,
+                "retry_delay": settings.VAULT_QUEUE_RETRY_DELAY_SECONDS,
+            })
+            db.commit()
+
+    def drain_once(self) -> int:
+        """
+        Processes one batch. Returns the number of items claimed (0 when the queue is empty).
+        """
+        with SessionLocal() as db:
+            items = db.execute(CLAIM_SQL, {"limit": settings.VAULT_QUEUE_BATCH_SIZE}).all()
+            db.commit()
+        if not items:
+            return 0
+
+        try:
+            self._store(items)
+        except Exception as e:
+            print(f"Vault ingest batch failed, retrying items individually: {e}")
+            for item in items:
+                try:
+                    self._store([item])
+                except Exception as item_error:
+                    self._mark_failed(item, item_error)
+        return len(items)
+
+    def _store(self, items: List):
+        chunked = [(item, self.rag_service.split_text(item.content)) for item in items]
+        all_chunks = [chunk for _, chunks in chunked for chunk in chunks]
+        embeddings = self.rag_service._get_embeddings(all_chunks)
+
+        with SessionLocal() as db:
+            offset = 0
+            for item, chunks in chunked:
+                self.rag_service._insert_chunks(
+                    db, item.user_id, chunks, embeddings[offset:offset + len(chunks)],
+                    category=item.category, source=item.source
+                )
+                offset += len(chunks)
+            db.query(VaultIngestJob).filter(VaultIngestJob.id.in_([i.id for i in items])).update(
+                {"status": "done", "error": None, "content": None}, synchronize_session=False
+            )
+            db.commit()
+
+    def _mark_failed(self, item, error: Exception):
+        status = "failed" if item.attempts >= settings.VAULT_QUEUE_MAX_ATTEMPTS else "pending"
+        # Backed off, so a transient error (DB hiccup, model load) doesn't burn every attempt at once
+        retry_delay = timedelta(seconds=item.attempts * settings.VAULT_QUEUE_RETRY_DELAY_SECONDS)
+        with SessionLocal() as db:
+            db.query(VaultIngestJob).filter(VaultIngestJob.id == item.id).update(
+                {"status": status, "error": str(error)[:2000], "available_at": func.now() + retry_delay},
+                synchronize_session=False
+            )
+            db.commit()
@@ -0,0 +1,148 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
+from sqlalchemy import text, func, cast, literal
+
+from app.config.database import engine
+from app.config.settings import settings
+from app.services.vault_indexes import create_vault_index_concurrently, index_state, vault_relation_bytes
+
+QUANTIZATION_MODES = ("none", "halfvec", "binary")
+
+# Expression indexes over knowledge_vault.embedding: the table keeps the float32
+# vectors for re-ranking, only the index holds the compact representation
+QUANTIZED_INDEXES = {
+    "halfvec": "ix_knowledge_vault_embedding_halfvec",
+    "binary": "ix_knowledge_vault_embedding_binary",
+}
+
+
+def quantized_index_definition(mode: str, dimension: int, column: str = "embedding") -> str:
+    dimension = int(dimension)
+    if mode == "halfvec":
+        # 16-bit floats: half the size, near-identical ranking
+        expression, ops = f"({column}::halfvec({dimension}))", "halfvec_cosine_ops"
+    elif mode == "binary":
+        # 1 bit per dimension (sign), compared by Hamming distance: 32x smaller
+        expression, ops = f"(binary_quantize({column})::bit({dimension}))", "bit_hamming_ops"
+    else:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+    return f"USING hnsw ({expression} {ops}) WITH (m = 16, ef_construction = 64)"
+
+
+def quantized_distance(mode: str, column, query_embedding, dimension: int):
+    """
+    First-pass distance matching the expression index for `mode` (so the planner can use it).
+    """
+    # Explicit cast: binary_quantize is overloaded (vector / halfvec)
+    query = cast(literal(query_embedding, Vector(dimension)), Vector(dimension))
+    if mode == "halfvec":
+        return cast(column, HALFVEC(dimension)).cosine_distance(cast(query, HALFVEC(dimension)))
+    if mode == "binary":
+        return cast(func.binary_quantize(column), BIT(dimension)).hamming_distance(
+            cast(func.binary_quantize(query), BIT(dimension))
+        )
+    raise ValueError(f"Unknown quantization mode: {mode}")
+
+
+def supports_quantization(conn) -> bool:
+    # halfvec and binary_quantize landed in pgvector 0.7.0
+    version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+    if not version:
+        return False
+    return tuple(int(p) for p in version.split(".")[:2]) >= (0, 7)
+
+
+def embedding_dimension(conn) -> int:
+    # vector's type modifier is its dimension
+    return conn.execute(text(
+        "SELECT atttypmod FROM pg_attribute "
+        "WHERE attrelid = 'knowledge_vault'::regclass AND attname = 'embedding' AND NOT attisdropped"
+    )).scalar()
+
+
+class QuantizedIndexManager:
+    """
+    Builds the compact index for VAULT_QUANTIZATION in the background and tells
+    search whether it is usable yet. Until it is, search stays on the full-precision index.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(QuantizedIndexManager, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._ready: Dict[str, tuple] = {} # mode -> (ready, checked_at)
+            self._lock = threading.Lock()
+            self._thread = None
+            self._initialized = True
+
+    def is_ready(self, mode: str) -> bool:
+        if mode not in QUANTIZED_INDEXES:
+            return False
+        ready, checked_at = self._ready.get(mode, (False, 0.0))
+        if time.monotonic() - checked_at < settings.VAULT_QUANTIZED_INDEX_CHECK_SECONDS:
+            return ready
+
+        with self._lock:
+            try:
+                with engine.connect() as conn:
+                    ready = bool(index_state(conn, QUANTIZED_INDEXES[mode]))
+            except Exception as e:
+                print(f"Could not check quantized index for {mode}: {e}")
+                ready = False
+            self._ready[mode] = (ready, time.monotonic())
+        return ready
+
+    def invalidate(self):
+        with self._lock:
+            self._ready.clear()
+
+    def ensure_index(self, mode: Optional[str] = None):
+        """
+        Creates the expression index for `mode` (default VAULT_QUANTIZATION) CONCURRENTLY.
+        """
+        mode = mode or settings.VAULT_QUANTIZATION
+        if mode == "none":
+            return
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            if not supports_quantization(conn):
+                print(f"VAULT_QUANTIZATION={mode} needs pgvector >= 0.7; searching at full precision only.")
+                return
+            valid = index_state(conn, QUANTIZED_INDEXES[mode])
+            started = time.perf_counter()
+            create_vault_index_concurrently(
+                conn, QUANTIZED_INDEXES[mode], quantized_index_definition(mode, embedding_dimension(conn))
+            )
+            if valid is not True:
+                print(f"Built {QUANTIZED_INDEXES[mode]} in {time.perf_counter() - started:.1f}s.")
+        self.invalidate()
+
+    def start_background_build(self, mode: Optional[str] = None):
+        if self._thread and self._thread.is_alive():
+            return
+
+        def build():
+            try:
+                self.ensure_index(mode)
+            except Exception as e:
+                print(f"Quantized index build failed: {e}")
+
+        self._thread = threading.Thread(target=build, name="vault-quantized-index", daemon=True)
+        self._thread.start()
+
+    def index_sizes(self, conn) -> dict:
+        # Summed over partitions
+        sizes = {}
+        for name in ["ix_knowledge_vault_embedding_ann", *QUANTIZED_INDEXES.values()]:
+            size = vault_relation_bytes(conn, name)
+            if size is not None:
+                sizes[name] = int(size)
+        sizes["knowledge_vault_table"] = int(vault_relation_bytes(conn, "knowledge_vault") or 0)
+        return sizes
@@ -0,0 +1,374 @@
+import argparse
+import threading
+import time
+from typing import List, Optional
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import text, bindparam
+from sqlalchemy.exc import OperationalError
+
+from app.config.database import SessionLocal, engine
+from app.config.settings import settings
+from app.models.vault_reembed_model import VaultReembedJob
+from app.models.vault_model import VAULT_CATEGORIES
+from app.services.embedding_registry import EmbeddingModelRegistry
+from app.services.rag_service import RagService, active_embedding_model, set_active_embedding_model
+from app.services.vault_quantization import QUANTIZED_INDEXES, QuantizedIndexManager, quantized_index_definition, supports_quantization
+from app.services.vault_indexes import create_vault_index_concurrently, rename_vault_index
+
+ACTIVE_STATUSES = ("running", "indexing", "cutover")
+
+# Session advisory lock held by the one process running the active job
+REEMBED_LOCK_KEY = 0x7265656D
+
+NEXT_INDEX = "ix_knowledge_vault_embedding_next_ann"
+NEXT_QUANTIZED_INDEX = "ix_knowledge_vault_embedding_next_quantized"
+MISSING_INDEX = "ix_knowledge_vault_embedding_next_missing"
+ANN_INDEX = "ix_knowledge_vault_embedding_ann"
+# Per-category partial indexes (alembic c7f2a9d4e1b0): shadow name -> final name
+CATEGORY_INDEXES = {
+    f"ix_knowledge_vault_embedding_next_{c}": f"ix_knowledge_vault_embedding_{c}" for c in VAULT_CATEGORIES[1:]
+}
+
+
+class VaultReembedService:
+    """
+    Re-embeds the whole vault into a new model while the vault stays live.
+
+    Phases (the job row's status, so a restart resumes where it stopped):
+      - running: rows are re-encoded in keyset batches (id > last_id) through the
+        target model's batcher and written to a shadow column, embedding_next.
+        The cursor is committed with each batch.
+      - indexing: the ANN index on embedding_next is built CONCURRENTLY, together
+        with a small partial index over rows that still lack a new vector.
+      - cutover: the stragglers are encoded under a write lock (reads continue),
+        then the columns/indexes are swapped by rename, which takes ACCESS EXCLUSIVE
+        and blocks readers too until the (short) transaction commits.
+    Until the swap, search and writes keep using the old column and model.
+
+    Every API worker calls start(); the job runs in whichever process takes
+    REEMBED_LOCK_KEY, the others return straight away.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(VaultReembedService, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._stop = threading.Event()
+            self._thread = None
+            self._initialized = True
+
+    # --- Control ---
+
+    def start_job(self, target_model: str) -> int:
+        """
+        Creates a re-embed job for `target_model` and starts it in the background.
+        """
+        if target_model == active_embedding_model():
+            raise ValueError(f"The vault is already embedded with {target_model}")
+
+        dimension = EmbeddingModelRegistry().get(target_model).get_sentence_embedding_dimension()
+        with SessionLocal() as db:
+            active = db.query(VaultReembedJob).filter(VaultReembedJob.status.in_(ACTIVE_STATUSES)).first()
+            if active is not None:
+                raise ValueError(f"Re-embed job {active.id} ({active.target_model}) is still {active.status}")
+            job = VaultReembedJob(target_model=target_model, dimension=dimension, status="running", last_id=0, rows_done=0)
+            db.add(job)
+            db.commit()
+            job_id = job.id
+
+        self.start()
+        return job_id
+
+    def start(self):
+        """
+        Runs (or resumes) the active job, if there is one, on a background thread.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="vault-reembed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> Optional[dict]:
+        with SessionLocal() as db:
+            job = db.query(VaultReembedJob).order_by(VaultReembedJob.id.desc()).first()
+            if job is None:
+                return None
+            return {
+                "id": job.id,
+                "target_model": job.target_model,
+                "status": job.status,
+                "last_id": job.last_id,
+                "rows_done": job.rows_done,
+                "error": job.error,
+                "active_model": active_embedding_model(),
+                "updated_at": job.updated_at,
+            }
+
+    # --- Phases ---
+
+    def run(self):
+        with engine.connect() as lock_conn:
+            if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": REEMBED_LOCK_KEY}).scalar():
+                return
+            lock_conn.commit()
+            try:
+                self._run_claimed()
+            finally:
+                # Session-level: has to be released before the connection goes back to the pool
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": REEMBED_LOCK_KEY})
+                lock_conn.commit()
+
+    def _run_claimed(self):
+        with SessionLocal() as db:
+            job = (
+                db.query(VaultReembedJob)
+                .filter(VaultReembedJob.status.in_(ACTIVE_STATUSES))
+                .order_by(VaultReembedJob.id)
+                .first()
+            )
+            job_id = job.id if job else None
+        if job_id is None:
+            return
+
+        try:
+            while not self._stop.is_set():
+                with SessionLocal() as db:
+                    job = db.get(VaultReembedJob, job_id)
+                    status, target, dimension = job.status, job.target_model, job.dimension
+
+                if status == "running":
+                    self._add_shadow_columns(dimension)
+                    if not self._backfill(job_id, target, dimension):
+                        return
+                    self._set_status(job_id, "indexing")
+                elif status == "indexing":
+                    self._build_indexes(dimension)
+                    # Rows inserted while the index was building
+                    if not self._backfill(job_id, target, dimension):
+                        return
+                    self._set_status(job_id, "cutover")
+                elif status == "cutover":
+                    self._cutover(job_id, target, dimension)
+                    print(f"Vault re-embed job {job_id} done; active embedding model is now {target}.")
+                    return
+                else:
+                    return
+        except Exception as e:
+            print(f"Vault re-embed job {job_id} failed: {e}")
+            self._set_status(job_id, "failed", error=str(e)[:2000])
+
+    def _add_shadow_columns(self, dimension: int):
+        # Nullable columns without defaults: a catalog-only change
+        self._with_lock_timeout([
+            f"ALTER TABLE knowledge_vault "
+            f"ADD COLUMN IF NOT EXISTS embedding_next vector({int(dimension)}), "
+            f"ADD COLUMN IF NOT EXISTS embedding_next_model VARCHAR(128)"
+        ])
+
+    def _backfill(self, job_id: int, target: str, dimension: int) -> bool:
+        """
+        Re-embeds rows past the job's cursor, one checkpointed batch per transaction.
+        Returns False if stopped before reaching the end of the table.
+        """
+        rag = RagService(model_name=target)
+        update_sql = self._update_sql("embedding_next", dimension)
+
+        while not self._stop.is_set():
+            with SessionLocal() as db:
+                last_id = db.get(VaultReembedJob, job_id).last_id
+                rows = db.execute(
+                    text("SELECT id, user_id, content_chunk FROM knowledge_vault WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                    {"last_id": last_id, "limit": settings.VAULT_REEMBED_BATCH_SIZE}
+                ).all()
+                if not rows:
+                    return True
+
+                embeddings = rag._get_embeddings([r.content_chunk for r in rows])
+                db.execute(update_sql, [
+                    {"id": r.id, "user_id": r.user_id, "embedding": e, "model": target} for r, e in zip(rows, embeddings)
+                ])
+                db.query(VaultReembedJob).filter(VaultReembedJob.id == job_id).update(
+                    {"last_id": rows[-1].id, "rows_done": VaultReembedJob.rows_done + len(rows)},
+                    synchronize_session=False
+                )
+                db.commit()
+        return False
+
+    def _build_indexes(self, dimension: int):
+        # Built online, partition by partition (see vault_indexes)
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            ann = self._ann_index_clause(conn)
+            create_vault_index_concurrently(conn, NEXT_INDEX, ann)
+            if ann.startswith("USING hnsw"):
+                for name, category in zip(CATEGORY_INDEXES, VAULT_CATEGORIES[1:]):
+                    create_vault_index_concurrently(conn, name, f"{ann} WHERE category = '{category}'")
+            # The compact first-pass index for VAULT_QUANTIZATION, if any; indexes follow a column rename
+            if settings.VAULT_QUANTIZATION != "none" and supports_quantization(conn):
+                create_vault_index_concurrently(
+                    conn, NEXT_QUANTIZED_INDEX,
+                    quantized_index_definition(settings.VAULT_QUANTIZATION, dimension, column="embedding_next")
+                )
+            # Lets the cutover find stragglers without scanning the table under lock
+            create_vault_index_concurrently(conn, MISSING_INDEX, "(id) WHERE embedding_next IS NULL")
+
+    def _ann_index_clause(self, conn) -> str:
+        # Same choice as alembic 3f9a1c2b7d10: HNSW where available (pgvector >= 0.5), else IVFFlat
+        version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+        if version and tuple(int(p) for p in version.split(".")[:2]) < (0, 5):
+            rows = conn.execute(text("SELECT count(*) FROM knowledge_vault")).scalar() or 0
+            return f"USING ivfflat (embedding_next vector_cosine_ops) WITH (lists = {max(10, rows // 1000)})"
+        return "USING hnsw (embedding_next vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+
+    def _cutover(self, job_id: int, target: str, dimension: int):
+        rag = RagService(model_name=target)
+        update_sql = self._update_sql("embedding_next", dimension)
+
+        for attempt in range(10):
+            db = SessionLocal()
+            try:
+                db.execute(text(f"SET LOCAL lock_timeout = '{int(settings.VAULT_REEMBED_LOCK_TIMEOUT_SECONDS)}s'"))
+                # Blocks writers while the stragglers are encoded; searches keep reading the old column.
+                # The DROP / RENAME COLUMNs below escalate to ACCESS EXCLUSIVE, blocking readers until commit.
+                db.execute(text("LOCK TABLE knowledge_vault IN SHARE ROW EXCLUSIVE MODE"))
+
+                stragglers = db.execute(
+                    text("SELECT id, user_id, content_chunk FROM knowledge_vault WHERE embedding_next IS NULL")
+                ).all()
+                if stragglers:
+                    embeddings = rag._get_embeddings([r.content_chunk for r in stragglers])
+                    db.execute(update_sql, [
+                        {"id": r.id, "user_id": r.user_id, "embedding": e, "model": target}
+                        for r, e in zip(stragglers, embeddings)
+                    ])
+
+                cutover_id = db.execute(text("SELECT coalesce(max(id), 0) FROM knowledge_vault")).scalar()
+                for statement in (
+                    f"DROP INDEX IF EXISTS {MISSING_INDEX}",
+                    "ALTER TABLE knowledge_vault DROP COLUMN embedding, DROP COLUMN embedding_model",
+                    "ALTER TABLE knowledge_vault RENAME COLUMN embedding_next TO embedding",
+                    "ALTER TABLE knowledge_vault RENAME COLUMN embedding_next_model TO embedding_model",
+                    # NOT VALID skips the scan here; validated after commit without blocking writes
+                    "ALTER TABLE knowledge_vault ADD CONSTRAINT ck_knowledge_vault_embedding_not_null "
+                    "CHECK (embedding IS NOT NULL) NOT VALID",
+                ):
+                    db.execute(text(statement))
+                renames = {NEXT_INDEX: ANN_INDEX, **CATEGORY_INDEXES}
+                if settings.VAULT_QUANTIZATION != "none":
+                    renames[NEXT_QUANTIZED_INDEX] = QUANTIZED_INDEXES[settings.VAULT_QUANTIZATION]
+                for name, final_name in renames.items():
+                    if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+                        rename_vault_index(db, name, final_name)
+                db.query(VaultReembedJob).filter(
+                    VaultReembedJob.id == job_id, VaultReembedJob.status.in_(ACTIVE_STATUSES)
+                ).update({"status": "done", "cutover_id": cutover_id, "error": None}, synchronize_session=False)
+                db.commit()
+                break
+            except OperationalError as e:
+                db.rollback()
+                if "lock timeout" not in str(e).lower() or attempt == 9:
+                    raise
+                print(f"Vault re-embed cutover could not lock knowledge_vault, retrying: {e}")
+                time.sleep(1 + attempt)
+            finally:
+                db.close()
+
+        set_active_embedding_model(target)
+        QuantizedIndexManager().invalidate()
+        self._restore_not_null()
+        self._sweep_stale_writes(job_id, target, dimension)
+
+    def _restore_not_null(self):
+        with SessionLocal() as db:
+            db.execute(text("ALTER TABLE knowledge_vault VALIDATE CONSTRAINT ck_knowledge_vault_embedding_not_null"))
+            db.commit()
+        # With a validated CHECK in place, SET NOT NULL doesn't rescan the table
+        self._with_lock_timeout([
+            "ALTER TABLE knowledge_vault ALTER COLUMN embedding SET NOT NULL",
+            "ALTER TABLE knowledge_vault DROP CONSTRAINT ck_knowledge_vault_embedding_not_null",
+        ])
+
+    def _sweep_stale_writes(self, job_id: int, target: str, dimension: int):
+        """
+        Other processes pick up the new model within VAULT_ACTIVE_MODEL_REFRESH_SECONDS;
+        rows they wrote with the old model in that window are re-embedded here.
+        """
+        self._stop.wait(settings.VAULT_ACTIVE_MODEL_REFRESH_SECONDS + 1)
+        rag = RagService(model_name=target)
+        update_sql = self._update_sql("embedding", dimension)
+        with SessionLocal() as db:
+            cutover_id = db.get(VaultReembedJob, job_id).cutover_id or 0
+            rows = db.execute(
+                text(
+                    "SELECT id, user_id, content_chunk FROM knowledge_vault "
+                    "WHERE id > :cutover_id AND embedding_model IS DISTINCT FROM :model"
+                ),
+                {"cutover_id": cutover_id, "model": target}
+            ).all()
+            if rows:
+                embeddings = rag._get_embeddings([r.content_chunk for r in rows])
+                db.execute(update_sql, [
+                    {"id": r.id, "user_id": r.user_id, "embedding": e, "model": target} for r, e in zip(rows, embeddings)
+                ])
+                db.commit()
+                print(f"Vault re-embed job {job_id}: re-embedded {len(rows)} rows written during the switch.")
+
+    # --- Helpers ---
+
+    def _update_sql(self, column: str, dimension: int):
+        # user_id keeps each update pruned to one partition's primary key
+        return text(
+            f"UPDATE knowledge_vault SET {column} = :embedding, {column}_model = :model "
+            f"WHERE user_id = :user_id AND id = :id"
+        ).bindparams(bindparam("embedding", type_=Vector(dimension)))
+
+    def _set_status(self, job_id: int, status: str, error: str = None):
+        # A finished (done / failed) job is never reopened or overwritten
+        with SessionLocal() as db:
+            values = {"status": status}
+            if error is not None:
+                values["error"] = error
+            db.query(VaultReembedJob).filter(
+                VaultReembedJob.id == job_id, VaultReembedJob.status.in_(ACTIVE_STATUSES)
+            ).update(values, synchronize_session=False)
+            db.commit()
+
+    def _with_lock_timeout(self, statements: List[str], attempts: int = 10):
+        """
+        Runs short DDL in one transaction, giving up on the lock quickly (and retrying)
+        so it never queues up behind long readers and stalls traffic.
+        """
+        for attempt in range(attempts):
+            try:
+                with SessionLocal() as db:
+                    db.execute(text(f"SET LOCAL lock_timeout = '{int(settings.VAULT_REEMBED_LOCK_TIMEOUT_SECONDS)}s'"))
+                    for statement in statements:
+                        db.execute(text(statement))
+                    db.commit()
+                return
+            except OperationalError as e:
+                if "lock timeout" not in str(e).lower() or attempt == attempts - 1:
+                    raise
+                time.sleep(1 + attempt)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed the knowledge vault with a new embedding model.")
+    parser.add_argument("model", nargs="?", help="SentenceTransformer model name; omit to resume the active job")
+    args = parser.parse_args()
+
+    service = VaultReembedService()
+    if args.model:
+        print(f"Started re-embed job {service.start_job(args.model)}.")
+    service.start()
+    service._thread.join()
+    print(service.status())
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+from app.config.settings import settings
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).lower()
+
+
+class VaultSearchCache:
+    """
+    Process-wide LRU of vault search results with a TTL.
+
+    Keys include the user's vault generation, so any write to the user's vault
+    makes older entries unreachable; they age out through the LRU/TTL bounds.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict() # key -> (stored_at, hits)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable) -> Optional[List]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < settings.VAULT_SEARCH_CACHE_TTL_SECONDS:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return list(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, key: Hashable, hits: List):
+        if settings.VAULT_SEARCH_CACHE_SIZE <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(hits))
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.VAULT_SEARCH_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache = VaultSearchCache()
+
+
+def get_search_cache() -> VaultSearchCache:
+    return _cache
@@ -32,10 +32,23 @@ const CommandCanvas = () => {
             setTimeout(() => setActiveAgent('Engineer'), 1500);
             setTimeout(() => setActiveAgent('Sentry'), 3000);
 
-            // Call backend agent (Guru mode for now for chat)
-            const result = await agentService.chatWithGuru(userMsg.content, messages);
+            // Call backend agent (Guru mode for now for chat); the reply streams in token by token
+            let streamed = false;
+            const appendToken = (text) => {
+                const first = !streamed;
+                streamed = true;
+                setMessages(prev => {
+                    if (first) return [...prev, { role: 'assistant', content: text }];
+                    const last = prev[prev.length - 1];
+                    return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+                });
+            };
+            const result = await agentService.chatWithGuru(userMsg.content, messages, appendToken);
 
-            setMessages(prev => [...prev, { role: 'assistant', content: result.response }]);
+            // The final reply replaces the streamed text (tokens may have been dropped)
+            setMessages(prev => streamed
+                ? [...prev.slice(0, -1), { role: 'assistant', content: result.response }]
+                : [...prev, { role: 'assistant', content: result.response }]);
             setActiveAgent('Idle');
         } catch (error) {
             console.error(error);
@@ -17,8 +17,42 @@ export const agentService = {
         return response.data;
     },
 
-    chatWithGuru: async (input, history = []) => {
-        const response = await api.post('/agent/chat', { input, chat_history: history });
-        return response.data;
+    streamEvents: async (streamPath, onEvent) => {
+        // EventSource can't send the Authorization header, so the SSE body is read with fetch
+        const token = localStorage.getItem('token');
+        const response = await fetch(`${api.defaults.baseURL}${streamPath}`, {
+            headers: token ? { Authorization: `Bearer ${token}` } : {},
+        });
+        if (!response.ok) throw new Error(`Stream failed with status ${response.status}`);
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let end;
+            while ((end = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, end);
+                buffer = buffer.slice(end + 2);
+                const data = block.split('\n').filter(l => l.startsWith('data: ')).map(l => l.slice(6)).join('\n');
+                if (data) onEvent(JSON.parse(data)); // Comment-only blocks are keep-alives
+            }
+        }
+    },
+
+    chatWithGuru: async (input, history = [], onToken = null) => {
+        // The chat runs as a queued job; its reply arrives on the job's event stream
+        const { data: job } = await api.post('/agent/chat', { input, chat_history: history });
+        let response = '';
+        let error = null;
+        await agentService.streamEvents(job.stream, (event) => {
+            if (event.kind === 'token' && event.node === 'guru' && onToken) onToken(event.data.text);
+            if (event.kind === 'node' && event.data.response !== undefined) response = event.data.response;
+            if (event.kind === 'status' && event.data.status === 'failed') error = event.data.error;
+        });
+        if (error) throw new Error(error);
+        return { ...job, response };
     }
 };
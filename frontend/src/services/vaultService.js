@@ -8,7 +8,16 @@ export const vaultService = {
     },
 
     getKeys: async () => {
-        const response = await api.get('/vault/');
-        return response.data;
+        // /vault/ is paginated: follow X-Next-After-Id until the last page
+        const items = [];
+        let afterId = null;
+        do {
+            const params = { limit: 500 };
+            if (afterId !== null) params.after_id = afterId;
+            const response = await api.get('/vault/', { params });
+            items.push(...response.data);
+            afterId = response.headers['x-next-after-id'] ?? null;
+        } while (afterId !== null);
+        return items;
     }
 };